@@ -1,93 +1,108 @@
 """Aggregate multiple story videos into a single final video file.
 
 Combines videos from command line arguments in order,
-inserting a fixed subscribe clip between stories.
+inserting a fixed subscribe clip between stories. Inputs that don't match
+the common size, frame rate or audio format are conformed first (see
+`conform`), so the videos can be joined by stream copy (see `smartcut`)
+without decoding them. If they still can't be (a codec or pixel format
+conform doesn't change), the timeline is re-encoded in parallel segments
+(see `segmented`) instead.
 """
 
 import argparse
 import sys
+import time
 from pathlib import Path
-from moviepy import VideoFileClip, concatenate_videoclips
+import numpy as np
+
+import audio_mix
+import conform
+import encoding_profiles
+import mp4
+import segmented
+import smartcut
 
 # Fixed path for subscribe clip
 SUBSCRIBE_CLIP_PATH = Path("output/subscribe.mp4")
 
 def aggregate(
     video_paths: list[Path],
-    output_path: Path
+    output_path: Path,
+    workers: int | None = None,
+    profile: encoding_profiles.EncodingProfile | None = None,
 ) -> None:
     """Concatenates videos with subscribe clips in between."""
+    profile = profile or encoding_profiles.load()
+    started = time.monotonic()
 
     if not video_paths:
         print("Error: No input videos provided.")
         return
 
-    clips = []
-    
-    # Load subscribe clip if it exists
-    subscribe_clip = None
-    if SUBSCRIBE_CLIP_PATH.exists():
-        print(f"Loading subscribe clip: {SUBSCRIBE_CLIP_PATH}")
-        try:
-            subscribe_clip = VideoFileClip(str(SUBSCRIBE_CLIP_PATH))
-        except Exception as e:
-             print(f"Error loading subscribe clip: {e}")
-             sys.exit(1)
-    else:
-        print(f"Warning: Subscribe clip not found at {SUBSCRIBE_CLIP_PATH}. Proceeding without it.")
-
-    loaded_clips = [] # Keep track to close them later
-
-    # Load all story videos
-    for i, vid_path in enumerate(video_paths):
+    for vid_path in video_paths:
         if not vid_path.exists():
             print(f"Error: Video file not found: {vid_path}")
             sys.exit(1)
-        
-        print(f"Loading video: {vid_path}")
-        try:
-            clip = VideoFileClip(str(vid_path))
-            loaded_clips.append(clip)
-            clips.append(clip)
-        except Exception as e:
-            print(f"Error loading video {vid_path}: {e}")
-            sys.exit(1)
 
-        # Insert subscribe clip after each story
-        if subscribe_clip:
-            # Reusing the same clip object works for concatenation
-            clips.append(subscribe_clip)
+    inputs = video_paths + ([SUBSCRIBE_CLIP_PATH] if SUBSCRIBE_CLIP_PATH.exists() else [])
+    try:
+        conformed = conform.conform(inputs)
+    except conform.ConformError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    subscribe_path = conformed[len(video_paths)] if len(conformed) > len(video_paths) else None
+    video_paths = conformed[:len(video_paths)]
+
+    if subscribe_path:
+        print(f"Using subscribe clip: {subscribe_path}")
+    else:
+        print(f"Warning: Subscribe clip not found at {SUBSCRIBE_CLIP_PATH}. Proceeding without it.")
 
-    if not clips:
-        print("No clips to aggregate.")
-        return
+    # Insert subscribe clip after each story
+    clip_paths = []
+    for vid_path in video_paths:
+        print(f"Adding video: {vid_path}")
+        clip_paths.append(vid_path)
+        if subscribe_path:
+            clip_paths.append(subscribe_path)
 
-    print(f"Concatenating {len(clips)} clips...")
     try:
-        final_video = concatenate_videoclips(clips, method="compose")
-        
-        print(f"Exporting to {output_path}...")
+        # Conformed inputs share one frame rate, so the first clip's is the timeline's
+        fps = float(conform.probe(clip_paths[0]).fps)
+        durations = [mp4.read_duration(p) for p in clip_paths]
+    except (conform.ConformError, mp4.MP4Error) as e:
+        print(f"Error reading video: {e}")
+        sys.exit(1)
+
+    print(f"Concatenating {len(clip_paths)} clips...")
+    try:
+        print(f"Exporting to {output_path} (encoding profile {profile.describe()})...")
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        final_video.write_videofile(
-            str(output_path),
-            codec="libx264",
-            audio_codec="aac",
-            logger="bar"
+        audio = np.concatenate(
+            [audio_mix.decode(p, seconds) for p, seconds in zip(clip_paths, durations)], axis=1,
         )
-        
-        final_video.close()
+        audio_path = output_path.with_name(f".{output_path.stem}.audio.m4a")
+        video_path = output_path.with_name(f".{output_path.stem}.video.mp4")
+        audio_mix.encode(audio, audio_path)
+
+        try:
+            try:
+                print("  Joining videos by stream copy...")
+                smartcut.assemble([(p, None) for p in clip_paths], video_path, fps, 0.0, 0.0, profile)
+                audio_mix.mux(video_path, audio_path, output_path, profile.faststart)
+            except smartcut.SmartCutError as e:
+                # Each story and subscribe clip is encoded as its own segment, in parallel
+                print(f"  Stream copy not possible ({e}); re-encoding the videos")
+                segments = [segmented.Segment(str(p)) for p in clip_paths]
+                segmented.render(segments, audio_path, output_path, fps, profile, workers)
+        finally:
+            video_path.unlink(missing_ok=True)
+            audio_path.unlink(missing_ok=True)
+        encoding_profiles.report(profile, started, output_path, sum(durations))
         
     except Exception as e:
         print(f"Error during concatenation/export: {e}")
-        
-    finally:
-        # Cleanup
-        for clip in loaded_clips:
-            clip.close()
-        
-        if subscribe_clip:
-            subscribe_clip.close()
 
     print("Done.")
 
@@ -95,13 +110,24 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Aggregate story videos into a single file.")
     parser.add_argument("videos", nargs="+", help="List of video files to combine in order.")
     parser.add_argument("--output", required=True, help="Path to the final output video file.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes encoding segments in parallel if stream copy isn't possible (default: CPU count).")
+    parser.add_argument("--profile", choices=list(encoding_profiles.PROFILES), default=None,
+                        help="Encoding profile (default: encoding.profile in config.yaml, "
+                             f"else {encoding_profiles.DEFAULT_PROFILE}).")
 
     args = parser.parse_args()
 
     video_paths = [Path(p) for p in args.videos]
     output_path = Path(args.output)
 
-    aggregate(video_paths, output_path)
+    try:
+        profile = encoding_profiles.load(args.profile)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    aggregate(video_paths, output_path, args.workers, profile)
 
 if __name__ == "__main__":
     main()
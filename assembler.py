@@ -3,28 +3,38 @@
 Reads clips from output/{video_id}/raw_clips/{story_name}/ in ID order,
 concatenates them, layers looping background music under the original audio,
 and exports the result.
+
+With --review, it cuts the 720p drafts in output/{video_id}/draft_clips/
+(see `video_generator.py --draft`) into a review video instead.
+
+Encoder settings come from a named profile (draft, review or publish; see
+`encoding_profiles`), chosen with --profile or in config.yaml.
 """
 
 import argparse
 import sys
+import time
+from dataclasses import replace
 from pathlib import Path
 
-from moviepy import (
-    AudioFileClip,
-    ColorClip,
-    CompositeAudioClip,
-    VideoFileClip,
-    concatenate_videoclips,
-)
-from moviepy.audio.fx import AudioFadeOut
-from moviepy.video.fx import FadeOut
+import numpy as np
 import yaml
 
+import audio_mix
+import conform
+import encoding_profiles
+import frames
+import mp4
+import segmented
+import smartcut
+
 MUSIC_VOLUME = 0.6  # background music relative to original audio
 TOTAL_VOLUME = 0.85  # Master volume for the final video
 FPS = 24
-I2V_TAIL_TRIM_SECONDS = 1.0  # keep in sync with video_generator.FRAME_OFFSET_SECONDS
+I2V_TAIL_TRIM_SECONDS = 1.0  # fallback when the clip has no recorded start-frame timestamp
 MIN_CLIP_DURATION_AFTER_TRIM = 0.1
+FADE_DURATION = 2.0
+BLACK_DURATION = 1.0
 
 
 
@@ -85,101 +95,120 @@ def _load_shot_modes(clips_dir: Path) -> tuple[dict[int, str], Path | None]:
     return modes, story_path
 
 
-def assemble(
-    clips_dir: str,
-    music_path: str | None,
-    output_path: str,
-) -> None:
-    clips_dir = Path(clips_dir)
-
-    clip_files = sorted(clips_dir.glob("*.mp4"), key=lambda p: int(p.stem))
-    if not clip_files:
-        print(f"No .mp4 files found in {clips_dir}", file=sys.stderr)
-        sys.exit(1)
-
-    shot_modes, _ = _load_shot_modes(clips_dir)
-
-    print(f"Loading {len(clip_files)} clips from {clips_dir}/")
-    clips: list[VideoFileClip] = []
+def _plan_cuts(clip_files: list[Path], shot_modes: dict[int, str]) -> list[tuple[Path, float | None]]:
+    """Return (clip, keep-until seconds) per clip; None keeps the whole clip.
 
+    A clip followed by an I2V shot is cut where that shot's start frame was
+    taken from, or I2V_TAIL_TRIM_SECONDS early if that wasn't recorded.
+    """
+    cuts: list[tuple[Path, float | None]] = []
     for idx, clip_path in enumerate(clip_files):
-        clip = VideoFileClip(str(clip_path))
         shot_id = int(clip_path.stem)
-        trim_seconds = 0.0
+        end = None
         if idx < len(clip_files) - 1 and shot_modes:
             next_id = int(clip_files[idx + 1].stem)
             next_mode = str(shot_modes.get(next_id, "t2v")).lower()
             if next_mode == "i2v":
-                trim_seconds = I2V_TAIL_TRIM_SECONDS
-
-        if trim_seconds > 0:
-            max_trim = max(0.0, clip.duration - MIN_CLIP_DURATION_AFTER_TRIM)
-            actual_trim = min(trim_seconds, max_trim)
-            if actual_trim <= 0:
-                print(f"  Warning: clip {clip_path.name} is too short to trim; leaving unmodified.")
-            else:
-                new_end = clip.duration - actual_trim
-                clip = clip.subclipped(0, new_end)
-                print(f"  Shot {shot_id}: trimmed tail by {actual_trim:.2f}s (next shot is I2V)")
-
-        clips.append(clip)
-
-    video = concatenate_videoclips(clips, method="compose")
-    print(f"  Total duration: {video.duration:.1f}s")
-
+                duration = mp4.read_duration(clip_path)
+                # Cut exactly where the next shot's start frame was taken from
+                frame_time = frames.read_frame_timestamp(clip_path)
+                if frame_time is not None:
+                    trim_seconds = duration - frame_time
+                    trim_reason = f"next shot is I2V, starts from frame at {frame_time:.2f}s"
+                else:
+                    trim_seconds = I2V_TAIL_TRIM_SECONDS
+                    trim_reason = "next shot is I2V"
+
+                max_trim = max(0.0, duration - MIN_CLIP_DURATION_AFTER_TRIM)
+                actual_trim = min(trim_seconds, max_trim)
+                if actual_trim <= 0:
+                    print(f"  Warning: clip {clip_path.name} is too short to trim; leaving unmodified.")
+                else:
+                    end = duration - actual_trim
+                    print(f"  Shot {shot_id}: trimmed tail by {actual_trim:.2f}s ({trim_reason})")
+        cuts.append((clip_path, end))
+    return cuts
+
+
+def _render_audio(parts: list[tuple[Path, float]], music_path: str | None, dest: Path) -> None:
+    """Build and encode the story's audio: each clip's audio for the seconds kept, music, volume and fade-out."""
+    story = np.concatenate([audio_mix.decode(path, seconds) for path, seconds in parts], axis=1)
     if music_path:
-        music = AudioFileClip(music_path)
         # Play music only once (no looping). Trim if longer than video.
-        if music.duration > video.duration:
-            music = music.subclipped(0, video.duration)
-
-        bg_music = music.with_volume_scaled(MUSIC_VOLUME)
-
-        if video.audio is not None:
-            mixed = CompositeAudioClip([video.audio, bg_music])
-        else:
-            mixed = bg_music
-
-        # Apply master volume
-        mixed = mixed.with_volume_scaled(TOTAL_VOLUME)
-        video = video.with_audio(mixed)
+        story += MUSIC_VOLUME * audio_mix.decode(music_path, story.shape[1] / audio_mix.SAMPLE_RATE)
         print(f"  Music: {music_path} (once, volume {MUSIC_VOLUME}, master {TOTAL_VOLUME})")
     else:
         print("  No background music — using original audio only")
-        if video.audio is not None:
-            video = video.with_audio(video.audio.with_volume_scaled(TOTAL_VOLUME))
 
-    # Add fade out and black screen at the end
-    FADE_DURATION = 2.0
-    BLACK_DURATION = 1.0
+    # Apply master volume, fade out, and stay silent over the black screen
+    story *= TOTAL_VOLUME
+    audio_mix.fade_out(story, FADE_DURATION)
+    audio_mix.encode(np.concatenate([story, audio_mix.silence(BLACK_DURATION)], axis=1), dest)
 
-    print(f"  Adding {FADE_DURATION}s fade-out and {BLACK_DURATION}s black screen...")
 
-    # Fade out video and audio
-    video = video.with_effects([FadeOut(duration=FADE_DURATION)])
-    if video.audio is not None:
-        video = video.with_audio(video.audio.with_effects([AudioFadeOut(duration=FADE_DURATION)]))
+def assemble(
+    clips_dir: str,
+    music_path: str | None,
+    output_path: str,
+    profile: encoding_profiles.EncodingProfile | None = None,
+    reencode: bool = False,
+    workers: int | None = None,
+) -> None:
+    clips_dir = Path(clips_dir)
+    profile = profile or encoding_profiles.load()
+    started = time.monotonic()
 
-    # Append black clip
-    black_clip = ColorClip(size=video.size, color=(0, 0, 0), duration=BLACK_DURATION).with_fps(FPS)
-    video = concatenate_videoclips([video, black_clip])
+    clip_files = sorted(clips_dir.glob("*.mp4"), key=lambda p: int(p.stem))
+    if not clip_files:
+        print(f"No .mp4 files found in {clips_dir}", file=sys.stderr)
+        sys.exit(1)
 
-    out = Path(output_path)
-    out.parent.mkdir(parents=True, exist_ok=True)
+    shot_modes, _ = _load_shot_modes(clips_dir)
 
-    print(f"  Exporting to {out}...")
-    video.write_videofile(
-        str(out),
-        fps=FPS,
-        codec="libx264",
-        audio_codec="aac",
-        logger="bar",
-    )
+    print(f"Loading {len(clip_files)} clips from {clips_dir}/ (encoding profile {profile.describe()})")
+    cuts = _plan_cuts(clip_files, shot_modes)
+    try:
+        conformed = conform.conform([path for path, _ in cuts], fps=FPS)
+    except conform.ConformError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    cuts = [(path, end) for path, (_, end) in zip(conformed, cuts)]
 
-    for clip in clips:
-        clip.close()
-    video.close()
+    out = Path(output_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    video_path = out.with_name(f".{out.stem}.video.mp4")
+    audio_path = out.with_name(f".{out.stem}.audio.m4a")
 
+    try:
+        kept = None
+        if not reencode:
+            try:
+                print("  Cutting video by stream copy...")
+                kept = smartcut.assemble(cuts, video_path, FPS, FADE_DURATION, BLACK_DURATION, profile)
+            except smartcut.SmartCutError as e:
+                print(f"  Stream copy not possible ({e}); re-encoding the whole story")
+
+        if kept is None:
+            durations = [mp4.read_duration(path) for path, _ in cuts]
+            kept = [d if end is None else min(end, d) for (_, end), d in zip(cuts, durations)]
+            # Each shot is encoded as its own segment; the fade-out covers the tail of the last one
+            segments = [segmented.Segment(str(path), 0.0, seconds) for (path, _), seconds in zip(cuts, kept)]
+            segments[-1] = replace(segments[-1], fade_out=min(FADE_DURATION, kept[-1]))
+            fmt = conform.probe(cuts[0][0])
+            segments.append(segmented.Segment(None, duration=BLACK_DURATION, size=(fmt.width, fmt.height)))
+            segmented.render(segments, None, video_path, FPS, profile, workers)
+
+        print(f"  Total duration: {sum(kept):.1f}s")
+        print(f"  Adding {FADE_DURATION}s fade-out and {BLACK_DURATION}s black screen...")
+        _render_audio([(path, seconds) for (path, _), seconds in zip(cuts, kept)], music_path, audio_path)
+
+        print(f"  Exporting to {out}...")
+        audio_mix.mux(video_path, audio_path, out, profile.faststart)
+    finally:
+        video_path.unlink(missing_ok=True)
+        audio_path.unlink(missing_ok=True)
+
+    encoding_profiles.report(profile, started, out, sum(kept) + BLACK_DURATION)
     print("Done.")
 
 
@@ -191,9 +220,21 @@ def main() -> None:
                         help="Optional path to background music file.")
     parser.add_argument("--output", default=None,
                         help="Output file path. Defaults to output/{video_id}/{video_id}.mp4.")
+    parser.add_argument("--reencode", action="store_true",
+                        help="Re-encode the whole story in parallel segments with the encoding profile "
+                             "instead of stream-copying the clips.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes encoding segments in parallel when re-encoding (default: CPU count).")
+    parser.add_argument("--review", action="store_true",
+                        help="Build a review cut from the story's drafts (draft_clips/) instead.")
+    parser.add_argument("--profile", choices=list(encoding_profiles.PROFILES), default=None,
+                        help="Encoding profile (default: review with --review, else encoding.profile in config.yaml, "
+                             f"else {encoding_profiles.DEFAULT_PROFILE}).")
     args = parser.parse_args()
 
     clips_path = Path(args.clips_dir)
+    if args.review and clips_path.parent.name == "raw_clips":
+        clips_path = clips_path.parent.parent / "draft_clips" / clips_path.name
     if not clips_path.exists():
         print(f"Error: clips directory not found: {clips_path}", file=sys.stderr)
         sys.exit(1)
@@ -203,9 +244,16 @@ def main() -> None:
     else:
         video_id = clips_path.parent.parent.name
         story_name = clips_path.name
-        output_path = str(Path("output") / video_id / f"{story_name}.mp4")
+        suffix = "_review" if args.review else ""
+        output_path = str(Path("output") / video_id / f"{story_name}{suffix}.mp4")
+
+    try:
+        profile = encoding_profiles.load(args.profile or ("review" if args.review else None))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
-    assemble(args.clips_dir, args.music, output_path)
+    assemble(str(clips_path), args.music, output_path, profile, args.reencode, args.workers)
 
 
 if __name__ == "__main__":
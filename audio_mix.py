@@ -0,0 +1,90 @@
+"""Build a video's audio track as one NumPy array.
+
+Each source (a clip's audio, the background music) is decoded to float PCM
+once, resampled to SAMPLE_RATE stereo on the way in, and cut to length.
+Gains, fades and the music mix are then whole-array operations, and the
+finished track is encoded to AAC a single time and muxed next to the video,
+which is never decoded for it.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+import smartcut
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros((CHANNELS, round(seconds * SAMPLE_RATE)), np.float32)
+
+
+def fit(pcm: np.ndarray, seconds: float) -> np.ndarray:
+    """`pcm` cut or padded with silence to exactly `seconds`."""
+    n = round(seconds * SAMPLE_RATE)
+    if pcm.shape[1] >= n:
+        return pcm[:, :n]
+    return np.concatenate([pcm, np.zeros((CHANNELS, n - pcm.shape[1]), np.float32)], axis=1)
+
+
+def decode(path: str | Path, seconds: float | None = None) -> np.ndarray:
+    """The first `seconds` (all, if None) of a file's audio as (CHANNELS, samples) float32.
+
+    A file without audio decodes to silence of the requested length.
+    """
+    import av
+
+    limit = None if seconds is None else round(seconds * SAMPLE_RATE)
+    chunks: list[np.ndarray] = []
+    decoded = 0
+    with av.open(str(path)) as container:
+        if container.streams.audio:
+            resampler = av.AudioResampler(format="fltp", layout="stereo", rate=SAMPLE_RATE)
+            for frame in container.decode(container.streams.audio[0]):
+                for out in resampler.resample(frame):
+                    chunks.append(out.to_ndarray())
+                    decoded += out.samples
+                if limit is not None and decoded >= limit:
+                    break
+            else:
+                chunks.extend(out.to_ndarray() for out in resampler.resample(None))
+    pcm = np.concatenate(chunks, axis=1) if chunks else np.zeros((CHANNELS, 0), np.float32)
+    return pcm if seconds is None else fit(pcm, seconds)
+
+
+def fade_out(pcm: np.ndarray, seconds: float) -> np.ndarray:
+    """Fade the last `seconds` of `pcm` linearly to silence, in place."""
+    n = min(pcm.shape[1], round(seconds * SAMPLE_RATE))
+    if n:
+        pcm[:, -n:] *= np.linspace(1.0, 0.0, n, endpoint=False, dtype=np.float32)
+    return pcm
+
+
+def encode(pcm: np.ndarray, path: Path) -> None:
+    """Encode `pcm` to AAC in an .m4a file."""
+    import av
+
+    frame_samples = 1024
+    pcm = np.ascontiguousarray(np.clip(pcm, -1.0, 1.0), np.float32)
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("aac", rate=SAMPLE_RATE, layout="stereo")
+        for start in range(0, pcm.shape[1], frame_samples):
+            frame = av.AudioFrame.from_ndarray(
+                np.ascontiguousarray(pcm[:, start:start + frame_samples]), format="fltp", layout="stereo",
+            )
+            frame.sample_rate, frame.pts = SAMPLE_RATE, start
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        container.mux(stream.encode())
+
+
+def mux(video_path: Path, audio_path: Path | None, output_path: Path, faststart: bool = False) -> None:
+    """Copy the video stream of `video_path` and the AAC in `audio_path` into `output_path`."""
+    # Video first, so it is stream 0 of the output
+    inputs, maps = (["-i", str(audio_path)], ["-map", "1:a"]) if audio_path is not None else ([], [])
+    movflags = ["-movflags", "+faststart"] if faststart else []
+    smartcut.run_ffmpeg(
+        "-i", str(video_path), *inputs, "-map", "0:v", *maps, "-c", "copy", *movflags, str(output_path),
+    )
@@ -2,11 +2,12 @@
 
 Shot 1 is generated from scratch. Each subsequent shot extends the previous
 one, giving Veo visual context to maintain continuity across the story.
+An extension reads the previous output from the project that generated it,
+so the whole story runs on one credential of the pool.
 """
 
 import argparse
-import base64
-import mimetypes
+import asyncio
 import os
 import sys
 import time
@@ -14,9 +15,17 @@ from pathlib import Path
 
 import yaml
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import clients  # noqa: E402
+import downloader  # noqa: E402
+import latency_model  # noqa: E402
+import mp4  # noqa: E402
+import ref_assets  # noqa: E402
+import retry_policy  # noqa: E402
+from operation_poller import OperationPoller, deadline_for  # noqa: E402
+
 load_dotenv()
 
 USE_VERTEX = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "false").lower() == "true"
@@ -46,55 +55,34 @@ FORMAT_CONFIG = {
     "short":  {"aspect_ratio": "9:16"},
 }
 
-POLL_INTERVAL_SECONDS = 15
-DELAY_BETWEEN_SHOTS_SECONDS = 5
-MAX_RETRIES = 3
-RETRY_BACKOFF_SECONDS = 60
-MIN_VALID_BYTES = 1 * 1024 * 1024  # 1 MB — anything smaller is treated as a failed generation
-
 
-def download_from_gcs(gcs_uri: str, dest_path: str) -> None:
-    """Download a file from a gs:// URI to a local path."""
-    from google.cloud import storage
-    bucket_name, blob_path = gcs_uri[5:].split("/", 1)
-    storage.Client().bucket(bucket_name).blob(blob_path).download_to_filename(dest_path)
 
-
-def get_video_bytes(client: genai.Client, video) -> bytes:
-    """Return video bytes, handling both Gemini API and Vertex AI response formats."""
-    if USE_VERTEX and GCS_OUTPUT_URI and getattr(video, "uri", None):
-        tmp = Path("/tmp/_veo_tmp.mp4")
-        download_from_gcs(video.uri, str(tmp))
-        data = tmp.read_bytes()
-        tmp.unlink(missing_ok=True)
-        return data
-    if not USE_VERTEX:
-        client.files.download(file=video)
-    return video.video_bytes
+def save_video(video, out_path: Path, api_key: str | None = None) -> None:
+    """Stream the video to out_path, handling both Gemini API (URI) and Vertex AI (GCS or inline) outputs."""
+    asyncio.run(downloader.download_video(video, out_path, api_key))
 
 
 def build_prompt(description: str) -> str:
     return f"{HERO_PREFIX}{description}{STYLE_SUFFIX}"
 
 
-def poll_operation(client: genai.Client, operation) -> object:
-    while not operation.done:
-        time.sleep(POLL_INTERVAL_SECONDS)
-        operation = client.operations.get(operation)
-    if operation.response is None:
-        error = getattr(operation, "error", None)
-        raise RuntimeError(f"Video generation failed: {error}")
+def poll_operation(client: clients.ClientPool, operation, key: str | None = None, deadline: float | None = None) -> object:
+    """Wait for the operation; raises OperationTimeout if it overruns `deadline` seconds or gets stuck."""
+    poller = OperationPoller(latency=latency_model.LatencyModel())
+    operation = asyncio.run(poller.wait(client, operation, key, deadline))
+    retry_policy.generated_video(operation)  # raises a typed error if there is no video
+    retry_policy.record_success(MODEL)
     return operation
 
 
 def generate_first_shot(
-    client: genai.Client,
+    client: clients.ClientPool,
     prompt: str,
     ref_image_path: str | None,
     aspect_ratio: str,
     duration: int,
-) -> tuple[bytes, object]:
-    """Generate the first shot from scratch. Returns (video_bytes, video_object)."""
+) -> tuple[object, object]:
+    """Generate the first shot from scratch. Returns (generated_video, clean_video_ref)."""
     config_kwargs = {
         "aspect_ratio": aspect_ratio,
         "number_of_videos": 1,
@@ -105,37 +93,39 @@ def generate_first_shot(
         config_kwargs["output_gcs_uri"] = GCS_OUTPUT_URI
 
     if ref_image_path:
-        image_bytes = Path(ref_image_path).read_bytes()
-        mime_type = mimetypes.guess_type(ref_image_path)[0] or "image/jpeg"
+        ref = ref_assets.load_ref(ref_image_path)
         config_kwargs["reference_images"] = [
             types.VideoGenerationReferenceImage(
                 image=types.Image(
-                    image_bytes=base64.b64encode(image_bytes).decode("utf-8"),
-                    mime_type=mime_type,
+                    image_bytes=ref.b64,
+                    mime_type=ref.mime_type,
                 ),
                 reference_type="asset",
             ),
         ]
 
-    operation = client.models.generate_videos(
+    retry_policy.wait_for_circuit(MODEL)
+    operation = client.submit(MODEL, lambda c: c.models.generate_videos(
         model=MODEL,
         prompt=prompt,
         config=types.GenerateVideosConfig(**config_kwargs),
+    ))
+    operation = poll_operation(
+        client, operation, latency_model.key_for(MODEL, RESOLUTION, duration, "t2v"), deadline_for(MODEL, duration),
     )
-    operation = poll_operation(client, operation)
 
     video = operation.response.generated_videos[0]
     clean = types.Video(uri=video.video.uri, mime_type=video.video.mime_type or "video/mp4")
-    return get_video_bytes(client, video.video), clean
+    return video.video, clean
 
 
 def extend_from_previous(
-    client: genai.Client,
+    client: clients.ClientPool,
     prompt: str,
     previous_video: object,
     duration: int,
-) -> tuple[bytes, object]:
-    """Extend a video from the previous shot's output. Returns (video_bytes, video_object)."""
+) -> tuple[object, object]:
+    """Extend a video from the previous shot's output. Returns (generated_video, clean_video_ref)."""
     MAX_EXTENSION_DURATION = 7  # Vertex AI video_extension only supports up to 7s
     config_kwargs = {
         "number_of_videos": 1,
@@ -145,17 +135,21 @@ def extend_from_previous(
     if USE_VERTEX and GCS_OUTPUT_URI:
         config_kwargs["output_gcs_uri"] = GCS_OUTPUT_URI
 
-    operation = client.models.generate_videos(
+    retry_policy.wait_for_circuit(MODEL)
+    operation = client.submit(MODEL, lambda c: c.models.generate_videos(
         model=MODEL,
         prompt=prompt,
         video=previous_video,
         config=types.GenerateVideosConfig(**config_kwargs),
+    ))
+    operation = poll_operation(
+        client, operation, latency_model.key_for(MODEL, None, MAX_EXTENSION_DURATION, "extend"),
+        deadline_for(MODEL, MAX_EXTENSION_DURATION),
     )
-    operation = poll_operation(client, operation)
 
     video = operation.response.generated_videos[0]
     clean = types.Video(uri=video.video.uri, mime_type=video.video.mime_type or "video/mp4")
-    return get_video_bytes(client, video.video), clean
+    return video.video, clean
 
 
 def process_story(
@@ -174,12 +168,14 @@ def process_story(
     out_dir.mkdir(parents=True, exist_ok=True)
 
     aspect_ratio = FORMAT_CONFIG[video_type]["aspect_ratio"]
-    client = genai.Client()
+    client = clients.make_pool().pinned(MODEL)
     shots = sorted(story["shots"], key=lambda s: s["id"])
 
     print(f"Generating {len(shots)} shots (extension mode) for '{story.get('title', story_name)}'")
     print(f"  Type: {video_type} ({aspect_ratio}), Duration: {shot_duration}s/shot")
     print(f"  Output: {out_dir}/")
+    if client.members[0].credential is not None:
+        print(f"  Credential: {client.members[0].name}")
 
     previous_video = None
 
@@ -191,7 +187,8 @@ def process_story(
 
         print(f"  Shot {shot_id}: {'generating from scratch' if is_first else 'extending from previous'}...")
 
-        for attempt in range(1, MAX_RETRIES + 1):
+        retry = retry_policy.Retry(MODEL)
+        while True:
             try:
                 if is_first:
                     video_file, previous_video = generate_first_shot(
@@ -203,28 +200,32 @@ def process_story(
                         client, prompt, previous_video, shot_duration,
                     )
 
-                out_path.write_bytes(video_file)
-                size = out_path.stat().st_size
-                if size < MIN_VALID_BYTES:
+                save_video(video_file, out_path, client.api_key_for(video_file))
+                try:
+                    # Extensions inherit the input's resolution and return the whole extended video
+                    if is_first:
+                        mp4.validate_clip(out_path, shot_duration, aspect_ratio, RESOLUTION)
+                    else:
+                        mp4.validate_clip(out_path, aspect_ratio=aspect_ratio)
+                except mp4.MP4Error:
                     out_path.unlink()
-                    raise ValueError(f"Output too small ({size} bytes) — likely a failed generation")
+                    raise
+                size = out_path.stat().st_size
                 print(f"  Shot {shot_id}: saved ({size / 1024 / 1024:.1f} MB)")
                 break
             except Exception as e:
                 error_msg = str(e)
-                if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                    wait = RETRY_BACKOFF_SECONDS * attempt
-                    print(f"  Shot {shot_id}: rate limited, retrying in {wait}s (attempt {attempt}/{MAX_RETRIES})")
-                    time.sleep(wait)
+                wait = retry.next_delay(e)
+                if wait is None:
+                    print(f"  Shot {shot_id}: FAILED ({retry.last_class}) after {retry.attempts} attempt(s) — {error_msg}")
+                    print(f"  Shot {shot_id}: stopping chain")
+                    return
+                if retry.last_class == retry_policy.QUOTA:
+                    print(f"  Shot {shot_id}: rate limited, backing off {wait:.0f}s (attempt {retry.attempts})")
+                    client.penalize(MODEL, wait, e)
                 else:
-                    print(f"  Shot {shot_id}: error — {error_msg}")
-                    if attempt == MAX_RETRIES:
-                        print(f"  Shot {shot_id}: FAILED after {MAX_RETRIES} attempts — stopping chain")
-                        return
-                    time.sleep(RETRY_BACKOFF_SECONDS)
-
-        if shot["id"] != shots[-1]["id"]:
-            time.sleep(DELAY_BETWEEN_SHOTS_SECONDS)
+                    print(f"  Shot {shot_id}: {retry.last_class} error — {error_msg}; retrying in {wait:.0f}s")
+                    time.sleep(wait)
 
     print("Done.")
 
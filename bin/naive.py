@@ -2,12 +2,12 @@
 
 Uses Veo 3.1 via the Gemini API to generate one clip per shot, serially.
 Hero shots include a reference image for character consistency.
+With --draft, shots are generated at DRAFT_RESOLUTION with DRAFT_MODEL into
+output/{video_id}/draft_clips/ for a quick review pass.
 """
 
 import argparse
-import base64
-import mimetypes
-import os
+import asyncio
 import sys
 import time
 from pathlib import Path
@@ -17,12 +17,23 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
-load_dotenv()
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import clients  # noqa: E402
+import content_cache  # noqa: E402
+import downloader  # noqa: E402
+import latency_model  # noqa: E402
+import mp4  # noqa: E402
+import rate_limiter  # noqa: E402
+import ref_assets  # noqa: E402
+import retry_policy  # noqa: E402
+from operation_poller import OperationPoller, deadline_for  # noqa: E402
 
-USE_VERTEX = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "false").lower() == "true"
+load_dotenv()
 
 MODEL = "veo-3.1-generate-preview"
 RESOLUTION = "4k"  # "720p" | "1080p" | "4k"
+DRAFT_MODEL = "veo-3.1-fast-generate-preview"
+DRAFT_RESOLUTION = "720p"
 
 HERO_PREFIX = (
     "Characters: Pop, a photorealistic calm adult golden retriever with warm amber eyes "
@@ -45,12 +56,6 @@ FORMAT_CONFIG = {
     "short":  {"aspect_ratio": "9:16"},
 }
 
-POLL_INTERVAL_SECONDS = 15
-DELAY_BETWEEN_SHOTS_SECONDS = 5
-MAX_RETRIES = 3
-RETRY_BACKOFF_SECONDS = 60
-MIN_VALID_BYTES = 1 * 1024 * 1024  # 1 MB — anything smaller is treated as a failed generation
-
 
 def build_prompt(description: str) -> str:
     return f"{HERO_PREFIX}{description}{STYLE_SUFFIX}"
@@ -62,45 +67,45 @@ def generate_shot(
     ref_image_path: str | None,
     aspect_ratio: str,
     duration: int,
-) -> bytes:
+    model: str = MODEL,
+    resolution: str = RESOLUTION,
+) -> types.Video:
     config_kwargs = {
         "aspect_ratio": aspect_ratio,
         "number_of_videos": 1,
         "duration_seconds": duration,
-        "resolution": RESOLUTION,
+        "resolution": resolution,
     }
 
     if ref_image_path:
-        image_bytes = Path(ref_image_path).read_bytes()
-        mime_type = mimetypes.guess_type(ref_image_path)[0] or "image/jpeg"
+        ref = ref_assets.load_ref(ref_image_path)
         config_kwargs["reference_images"] = [
             types.VideoGenerationReferenceImage(
                 image=types.Image(
-                    image_bytes=base64.b64encode(image_bytes).decode("utf-8"),
-                    mime_type=mime_type,
+                    image_bytes=ref.b64,
+                    mime_type=ref.mime_type,
                 ),
                 reference_type="asset",
             ),
         ]
 
+    retry_policy.wait_for_circuit(model)
+    rate_limiter.acquire(model)
     operation = client.models.generate_videos(
-        model=MODEL,
+        model=model,
         prompt=prompt,
         config=types.GenerateVideosConfig(**config_kwargs),
     )
 
-    while not operation.done:
-        time.sleep(POLL_INTERVAL_SECONDS)
-        operation = client.operations.get(operation)
+    # Raises OperationTimeout if it overruns its deadline or gets stuck, so the retry loop resubmits it
+    poller = OperationPoller(latency=latency_model.LatencyModel())
+    operation = asyncio.run(poller.wait(
+        client, operation, latency_model.key_for(model, resolution, duration, "t2v"), deadline_for(model, duration),
+    ))
 
-    if operation.response is None:
-        error = getattr(operation, "error", None)
-        raise RuntimeError(f"Video generation failed: {error}")
-
-    video = operation.response.generated_videos[0]
-    if not USE_VERTEX:
-        client.files.download(file=video.video)
-    return video.video
+    video = retry_policy.generated_video(operation)
+    retry_policy.record_success(model)
+    return video
 
 
 def process_story(
@@ -110,6 +115,7 @@ def process_story(
     video_type: str,
     start_shot: int = 1,
     end_shot: int | None = None,
+    draft: bool = False,
 ) -> None:
     path = Path(story_path)
     with open(path) as f:
@@ -117,65 +123,85 @@ def process_story(
 
     video_id = path.parent.name
     story_name = path.stem
-    out_dir = Path("output") / video_id / "raw_clips" / story_name
+    model, resolution = (DRAFT_MODEL, DRAFT_RESOLUTION) if draft else (MODEL, RESOLUTION)
+    out_dir = Path("output") / video_id / ("draft_clips" if draft else "raw_clips") / story_name
     out_dir.mkdir(parents=True, exist_ok=True)
 
     aspect_ratio = FORMAT_CONFIG[video_type]["aspect_ratio"]
-    client = genai.Client()
+    client = clients.make_client()
     shots = [s for s in sorted(story["shots"], key=lambda s: s["id"])
              if s["id"] >= start_shot and (end_shot is None or s["id"] <= end_shot)]
 
     print(f"Generating {len(shots)} shots for '{story.get('title', story_name)}'")
-    print(f"  Type: {video_type} ({aspect_ratio}), Duration: {shot_duration}s/shot")
+    print(f"  Type: {video_type} ({aspect_ratio}), Duration: {shot_duration}s/shot, {resolution} ({model})")
     if start_shot > 1 or end_shot is not None:
         range_str = f"{start_shot}–{end_shot if end_shot is not None else 'end'}"
         print(f"  Shot range: {range_str}")
     print(f"  Output: {out_dir}/")
 
+    ref_bytes = [ref_assets.load_ref(ref_image_path).data] if ref_image_path else []
+
     for shot in shots:
         shot_id = shot["id"]
         out_path = out_dir / f"{shot_id}.mp4"
+        prompt = build_prompt(shot["description"])
+        key = content_cache.content_key(
+            model, prompt, refs=ref_bytes, duration=shot_duration,
+            aspect_ratio=aspect_ratio, resolution=resolution, mode="t2v",
+        )
 
         if out_path.exists():
-            print(f"  Shot {shot_id}: already exists, skipping")
+            if content_cache.is_current(out_path, key):
+                print(f"  Shot {shot_id}: already exists, skipping")
+                continue
+            print(f"  Shot {shot_id}: inputs changed since it was generated, regenerating")
+            out_path.unlink()
+        if content_cache.fetch(key, out_path):
+            print(f"  Shot {shot_id}: served from cache")
             continue
 
-        prompt = build_prompt(shot["description"])
         print(f"  Shot {shot_id}: generating...")
 
         success = False
-        for attempt in range(1, MAX_RETRIES + 1):
+        retry = retry_policy.Retry(model)
+        video_file = None  # kept across attempts so a failed download retries the same video
+        while True:
             try:
-                video_file = generate_shot(
-                    client, prompt, ref_image_path,
-                    aspect_ratio, shot_duration,
-                )
-                video_file.save(str(out_path))
-                size = out_path.stat().st_size
-                if size < MIN_VALID_BYTES:
+                if video_file is None:
+                    video_file = generate_shot(
+                        client, prompt, ref_image_path,
+                        aspect_ratio, shot_duration, model, resolution,
+                    )
+                # Streamed to disk in chunks: a 4k clip is never held in memory
+                digest = asyncio.run(downloader.download_video(video_file, out_path))
+                try:
+                    mp4.validate_clip(out_path, shot_duration, aspect_ratio, resolution)
+                except mp4.MP4Error:
                     out_path.unlink()
-                    raise ValueError(f"Output too small ({size} bytes) — likely a failed generation")
+                    video_file = None
+                    raise
+                size = out_path.stat().st_size
+                content_cache.store(key, out_path, digest)
                 print(f"  Shot {shot_id}: saved ({size / 1024 / 1024:.1f} MB)")
                 success = True
                 break
             except Exception as e:
                 error_msg = str(e)
-                if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                    wait = RETRY_BACKOFF_SECONDS * attempt
-                    print(f"  Shot {shot_id}: rate limited, retrying in {wait}s (attempt {attempt}/{MAX_RETRIES})")
-                    time.sleep(wait)
+                wait = retry.next_delay(e)
+                if wait is None:
+                    break
+                if retry.last_class == retry_policy.QUOTA:
+                    print(f"  Shot {shot_id}: rate limited, backing off {wait:.0f}s (attempt {retry.attempts})")
+                    rate_limiter.penalize(model, wait)
                 else:
-                    print(f"  Shot {shot_id}: error — {error_msg}")
-                    if attempt < MAX_RETRIES:
-                        time.sleep(RETRY_BACKOFF_SECONDS)
+                    print(f"  Shot {shot_id}: {retry.last_class} error — {error_msg}; retrying in {wait:.0f}s")
+                    time.sleep(wait)
 
         if not success:
-            print(f"  Shot {shot_id}: FAILED after {MAX_RETRIES} attempts — quitting. Resume with --start_shot {shot_id}")
+            print(f"  Shot {shot_id}: FAILED ({retry.last_class}) after {retry.attempts} attempt(s) — {error_msg}")
+            print(f"  Quitting. Resume with --start_shot {shot_id}")
             sys.exit(1)
 
-        if shot["id"] != shots[-1]["id"]:
-            time.sleep(DELAY_BETWEEN_SHOTS_SECONDS)
-
     print("Done.")
 
 
@@ -188,6 +214,8 @@ def main() -> None:
                         help="Video type: 'normal' (landscape 16:9) or 'short' (portrait 9:16).")
     parser.add_argument("--start_shot", default=1, type=int, help="Shot ID to start from (default: 1).")
     parser.add_argument("--end_shot", default=None, type=int, help="Shot ID to stop at, inclusive (default: last shot).")
+    parser.add_argument("--draft", action="store_true",
+                        help=f"Generate {DRAFT_RESOLUTION} drafts with {DRAFT_MODEL} into draft_clips/ for review.")
     args = parser.parse_args()
 
     if not Path(args.story).exists():
@@ -197,7 +225,8 @@ def main() -> None:
         print(f"Error: reference image not found: {args.ref_image}", file=sys.stderr)
         sys.exit(1)
 
-    process_story(args.story, args.ref_image, args.shot_duration, args.video_type, args.start_shot, args.end_shot)
+    process_story(args.story, args.ref_image, args.shot_duration, args.video_type, args.start_shot, args.end_shot,
+                  args.draft)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""Construct the genai client every script uses.
+
+Normally this is a plain `genai.Client()` configured from the environment.
+Setting INU_FAKE_BACKEND swaps in the offline fake backend (see
+`fake_backend`): "1" for the in-process fake client, or the URL of a running
+`python fake_backend.py` server to drive the real SDK against it.
+
+Veo throughput is capped per project, so `make_pool` can spread generation
+over several credentials listed in INU_CREDENTIALS, e.g.
+
+    INU_CREDENTIALS=key:AIza...,key:AIza...,vertex:my-project/us-central1
+
+Each credential gets its own rate-limit bucket (see `rate_limiter`), and each
+request goes to the credential expected to finish it soonest: the wait for
+its next quota token plus its observed completion time. Without
+INU_CREDENTIALS the pool holds just the environment's default client and
+behaves exactly like it.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from google import genai
+from google.genai import types
+
+import rate_limiter
+
+FAKE_BACKEND_ENV = "INU_FAKE_BACKEND"
+CREDENTIALS_ENV = "INU_CREDENTIALS"
+DEFAULT_LOCATION = "us-central1"
+LATENCY_SMOOTHING = 0.3  # weight of the newest completion time in a credential's moving average
+
+
+@dataclass(frozen=True)
+class Credential:
+    """One Gemini API key or Vertex AI project/location, with its own quota."""
+
+    name: str
+    api_key: str | None = None
+    project: str | None = None
+    location: str | None = None
+
+
+def load_credentials() -> list[Credential]:
+    """Parse INU_CREDENTIALS: comma-separated "key:API_KEY" or "vertex:PROJECT[/LOCATION]" entries."""
+    entries = [e.strip() for e in os.getenv(CREDENTIALS_ENV, "").split(",") if e.strip()]
+    credentials = []
+    for i, entry in enumerate(entries, 1):
+        kind, _, value = entry.partition(":")
+        if kind == "key" and value:
+            credentials.append(Credential(f"key{i}", api_key=value))
+        elif kind == "vertex" and value:
+            project, _, location = value.partition("/")
+            location = location or os.getenv("GOOGLE_CLOUD_LOCATION", DEFAULT_LOCATION)
+            credentials.append(Credential(f"{project}/{location}", project=project, location=location))
+        else:
+            raise ValueError(f"{CREDENTIALS_ENV}: expected key:API_KEY or vertex:PROJECT[/LOCATION], got {entry!r}")
+    return credentials
+
+
+def make_client(credential: Credential | None = None):
+    """A client for `credential`, or for the environment's default one."""
+    fake = os.getenv(FAKE_BACKEND_ENV)
+    if not fake:
+        if credential is None:
+            return genai.Client()
+        if credential.api_key:
+            return genai.Client(vertexai=False, api_key=credential.api_key)
+        return genai.Client(vertexai=True, project=credential.project, location=credential.location)
+    if fake.startswith("http://") or fake.startswith("https://"):
+        api_key = credential.api_key if credential is not None and credential.api_key else None
+        return genai.Client(
+            vertexai=False,
+            api_key=api_key or os.getenv("GEMINI_API_KEY") or "fake",
+            http_options=types.HttpOptions(base_url=fake),
+        )
+
+    import fake_backend
+    return fake_backend.FakeClient()
+
+
+@dataclass
+class _Member:
+    credential: Credential | None  # None for the environment's default client
+    client: object
+    latency: float | None = None  # moving average of completion seconds
+    submitted: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.credential.name if self.credential is not None else "default"
+
+    @property
+    def bucket(self) -> str | None:
+        """Rate-limit bucket suffix; the default client shares the plain per-model bucket."""
+        return self.credential.name if self.credential is not None else None
+
+    @property
+    def api_key(self) -> str | None:
+        return self.credential.api_key if self.credential is not None else None
+
+
+class _PoolOperations:
+    def __init__(self, pool: "ClientPool") -> None:
+        self._pool = pool
+
+    async def get(self, operation):
+        return await self._pool._get_async(operation)
+
+
+class ClientPool:
+    """Route generation requests across credentials and poll each operation through its owner.
+
+    Submit with `submit` / `submit_async`; the pool also stands in for a
+    client wherever operations are polled or re-attached
+    (`aio.operations.get`), since an operation can only be read back with the
+    credential that created it.
+    """
+
+    def __init__(self, members: list[_Member]) -> None:
+        self.members = members
+        self._owners: dict[str, tuple[_Member, float | None]] = {}  # operation name -> (member, submitted at)
+        self._videos: dict[str, _Member] = {}  # generated video URI -> member
+        self.aio = SimpleNamespace(operations=_PoolOperations(self))
+
+    def _pick(self, model: str) -> _Member:
+        if len(self.members) == 1:
+            return self.members[0]
+        known = [m.latency for m in self.members if m.latency is not None]
+        typical = sum(known) / len(known) if known else 0.0
+
+        def expected_finish(member: _Member) -> tuple[float, int]:
+            wait = rate_limiter.wait_seconds(model, member.bucket)
+            latency = member.latency if member.latency is not None else typical
+            return wait + latency, member.submitted
+
+        return min(self.members, key=expected_finish)
+
+    def pinned(self, model: str) -> "ClientPool":
+        """A pool of just the credential best placed for `model` now.
+
+        For requests that must share a credential, e.g. a chain of Veo
+        extensions, each of which reads the previous output from its project.
+        """
+        return ClientPool([self._pick(model)])
+
+    def _track(self, member: _Member, operation) -> None:
+        member.submitted += 1
+        self._owners[operation.name] = (member, time.monotonic())
+
+    def submit(self, model: str, submit):
+        """Call `submit(client)` with the chosen credential's client once its rate limit admits it."""
+        member = self._pick(model)
+        rate_limiter.acquire(model, credential=member.bucket)
+        try:
+            operation = submit(member.client)
+        except Exception as e:
+            e.credential = member.name
+            raise
+        self._track(member, operation)
+        return operation
+
+    async def submit_async(self, model: str, submit):
+        """Async variant of `submit`; `submit` is a coroutine function."""
+        member = self._pick(model)
+        await rate_limiter.acquire_async(model, credential=member.bucket)
+        try:
+            operation = await submit(member.client)
+        except Exception as e:
+            e.credential = member.name
+            raise
+        self._track(member, operation)
+        return operation
+
+    async def _get_async(self, operation):
+        owner = self._owners.get(operation.name)
+        if owner is not None:
+            member, submitted_at = owner
+            result = await member.client.aio.operations.get(operation)
+        else:
+            # Re-attaching to an operation from an earlier run: ask each credential in turn
+            for i, member in enumerate(self.members):
+                try:
+                    result = await member.client.aio.operations.get(operation)
+                    break
+                except Exception:
+                    if i == len(self.members) - 1:
+                        raise
+            submitted_at = None
+            self._owners[operation.name] = (member, None)
+        if result.done:
+            self._settle(member, result, submitted_at)
+        return result
+
+    def _settle(self, member: _Member, operation, submitted_at: float | None) -> None:
+        if getattr(operation, "error", None) is not None or operation.response is None:
+            return
+        for generated in operation.response.generated_videos or []:
+            if generated.video is not None and generated.video.uri:
+                self._videos[generated.video.uri] = member
+        if submitted_at is not None:
+            elapsed = time.monotonic() - submitted_at
+            member.latency = elapsed if member.latency is None else (
+                LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * member.latency
+            )
+
+    def penalize(self, model: str, seconds: float, exc: BaseException | None = None) -> None:
+        """After a 429, back off the credential that raised `exc`, or every credential if that's unknown."""
+        name = getattr(exc, "credential", None)
+        for member in self.members:
+            if name is None or member.name == name:
+                rate_limiter.penalize(model, seconds, credential=member.bucket)
+
+    def api_key_for(self, video) -> str | None:
+        """The API key needed to download `video`, if it came from a keyed credential."""
+        member = self._videos.get(getattr(video, "uri", None) or "")
+        return member.api_key if member is not None else None
+
+    def summary(self) -> str:
+        parts = []
+        for m in self.members:
+            latency = f", ~{m.latency:.0f}s each" if m.latency is not None else ""
+            parts.append(f"{m.name}: {m.submitted} request(s){latency}")
+        return "; ".join(parts)
+
+
+def make_pool() -> ClientPool:
+    """A pool over INU_CREDENTIALS, or over the default client when it isn't set."""
+    credentials = load_credentials()
+    if not credentials:
+        return ClientPool([_Member(None, make_client())])
+    return ClientPool([_Member(c, make_client(c)) for c in credentials])
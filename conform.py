@@ -0,0 +1,168 @@
+"""Bring a set of clips to one format before they are joined.
+
+Joining is only cheap when every input shares a frame size, frame rate,
+pixel format and audio layout: the stream-copy path (`smartcut`) needs it,
+and MoviePy's "chain" concatenation, unlike "compose", does no compositing
+onto a canvas and so needs clips of one size. `conform` probes the inputs'
+stream headers, takes the most common value of each property as the target,
+and transcodes only the outliers — letterboxed to the target size rather
+than stretched — leaving clips that already match untouched.
+
+Conformed copies are cached under output/.cache/conform/, keyed on the
+source file (path, size and modification time) and the target, so re-running
+an assembly doesn't transcode the same outlier again.
+"""
+
+import hashlib
+import os
+import subprocess
+from collections import Counter
+from dataclasses import dataclass, fields
+from fractions import Fraction
+from pathlib import Path
+
+import smartcut
+
+CONFORM_CACHE_DIR = Path("output") / ".cache" / "conform"
+CONFORM_CRF = 16  # conformed clips are intermediates, so keep them visually lossless
+CONFORM_PRESET = "medium"
+DEFAULT_PROFILE = "High"
+
+
+class ConformError(RuntimeError):
+    """A clip couldn't be probed or transcoded."""
+
+
+@dataclass(frozen=True)
+class MediaFormat:
+    codec: str
+    profile: str | None
+    width: int
+    height: int
+    fps: Fraction
+    pix_fmt: str | None
+    sample_rate: int | None  # None when the clip has no audio
+    channels: int | None
+
+    def describe(self) -> str:
+        audio = f", {self.sample_rate} Hz x{self.channels}" if self.sample_rate else ""
+        return f"{self.codec} {self.width}x{self.height} @ {float(self.fps):g} fps {self.pix_fmt}{audio}"
+
+
+def probe(path: Path) -> MediaFormat:
+    """Read a clip's format from its stream headers."""
+    import av
+
+    try:
+        with av.open(str(path)) as container:
+            if not container.streams.video:
+                raise ConformError(f"{path.name} has no video stream")
+            video = container.streams.video[0]
+            ctx = video.codec_context
+            rate = video.average_rate or video.guessed_rate
+            audio = container.streams.audio[0] if container.streams.audio else None
+            return MediaFormat(
+                codec=ctx.name,
+                profile=ctx.profile,
+                width=ctx.width,
+                height=ctx.height,
+                fps=Fraction(rate) if rate else Fraction(0),
+                pix_fmt=ctx.format.name if ctx.format is not None else None,
+                sample_rate=audio.sample_rate if audio is not None else None,
+                channels=audio.channels if audio is not None else None,
+            )
+    except av.error.FFmpegError as e:
+        raise ConformError(f"cannot read {path.name}: {e}") from e
+
+
+def choose_target(formats: list[MediaFormat], fps: float | None = None) -> MediaFormat:
+    """The most common value of each property (the earliest clip breaks ties).
+
+    `fps` overrides the frame rate, for callers that render at a fixed rate.
+    Audio properties are taken from the clips that have audio. The codec is
+    always H.264, since that is what outliers are transcoded to.
+    """
+    def most_common(values: list):
+        values = [v for v in values if v is not None]
+        return Counter(values).most_common(1)[0][0] if values else None
+
+    h264 = [f for f in formats if f.codec == "h264"]
+    return MediaFormat(
+        codec="h264",
+        profile=most_common([f.profile for f in h264]) or DEFAULT_PROFILE,
+        width=most_common([f.width for f in formats]),
+        height=most_common([f.height for f in formats]),
+        fps=Fraction(fps).limit_denominator(1001) if fps else most_common([f.fps for f in formats]),
+        pix_fmt=most_common([f.pix_fmt for f in formats]) or "yuv420p",
+        sample_rate=most_common([f.sample_rate for f in formats]),
+        channels=most_common([f.channels for f in formats]),
+    )
+
+
+def mismatches(fmt: MediaFormat, target: MediaFormat) -> list[str]:
+    """Names of the properties in which `fmt` differs from `target`.
+
+    The H.264 profile doesn't count (joined streams carry each clip's own
+    parameter sets), and a clip without audio matches on audio.
+    """
+    names = []
+    for field in fields(MediaFormat):
+        value = getattr(fmt, field.name)
+        if field.name == "profile":
+            continue
+        if field.name in ("sample_rate", "channels") and (value is None or target.sample_rate is None):
+            continue
+        if value != getattr(target, field.name):
+            names.append(field.name)
+    return names
+
+
+def _cache_path(source: Path, target: MediaFormat) -> Path:
+    stat = source.stat()
+    key = f"{source.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{target}|{CONFORM_CRF}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:24]
+    return CONFORM_CACHE_DIR / f"{source.stem}-{digest}.mp4"
+
+
+def _transcode(source: Path, target: MediaFormat, dest: Path) -> None:
+    w, h = target.width, target.height
+    video_filter = (
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1,"
+        f"fps={target.fps},format={target.pix_fmt}"
+    )
+    args = [
+        smartcut.ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y", "-i", str(source),
+        "-map", "0:v:0", "-map", "0:a:0?", "-vf", video_filter,
+        "-c:v", "libx264", "-preset", CONFORM_PRESET, "-crf", str(CONFORM_CRF),
+        "-profile:v", smartcut.PROFILES.get(target.profile, "high"),
+    ]
+    args += ["-c:a", "aac"]
+    if target.sample_rate:
+        args += ["-ar", str(target.sample_rate), "-ac", str(target.channels)]
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.stem}.{os.getpid()}.tmp.mp4")
+    result = subprocess.run([*args, str(tmp)], capture_output=True, text=True)
+    if result.returncode != 0:
+        tmp.unlink(missing_ok=True)
+        raise ConformError(f"conforming {source.name} failed: {result.stderr.strip() or result.returncode}")
+    os.replace(tmp, dest)
+
+
+def conform(paths: list[Path], fps: float | None = None) -> list[Path]:
+    """Return `paths` with every clip that doesn't match the common format replaced by a conformed copy."""
+    probed = {p: probe(p) for p in paths}
+    target = choose_target([probed[p] for p in paths], fps)
+    replaced: dict[Path, Path] = {}
+    for path, fmt in probed.items():
+        differs = mismatches(fmt, target)
+        if not differs:
+            continue
+        dest = _cache_path(path, target)
+        if dest.exists():
+            print(f"  {path.name}: using conformed copy ({', '.join(differs)})")
+        else:
+            print(f"  {path.name}: conforming {fmt.describe()} -> {target.describe()}")
+            _transcode(path, target, dest)
+        replaced[path] = dest
+    return [replaced.get(p, p) for p in paths]
@@ -0,0 +1,133 @@
+"""Content-addressed cache for generated clips and images.
+
+A cache key is a hash of everything that affects a generation's output: the
+model, the rendered prompt, the bytes of every reference image and start
+frame, and the duration / aspect ratio / resolution settings. Outputs are
+stored under output/.cache/content/ by key, so an identical request made
+under another video_id (or after deleting an output) is served from disk.
+
+Each output file also gets a small `.<name>.key` stamp next to it recording
+the key it was produced from. When a story is edited, the stamp no longer
+matches the new key and the stale output is regenerated instead of skipped.
+
+A cached output stored with its sha256 (downloaded clips, see `downloader`)
+is hashed again on every cache hit; an entry that no longer matches is
+dropped and counts as a miss, so a corrupted clip is regenerated rather than
+copied into a story.
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+CACHE_DIR = Path("output") / ".cache" / "content"
+
+
+def content_key(
+    model: str,
+    prompt: str,
+    *,
+    refs: list[bytes] | tuple[bytes, ...] = (),
+    start_frame: bytes | None = None,
+    duration: int | None = None,
+    aspect_ratio: str | None = None,
+    resolution: str | None = None,
+    mode: str | None = None,
+) -> str:
+    """Hash every input that affects the generated output."""
+    digest = hashlib.sha256()
+    fields = [
+        ("model", model.encode()),
+        ("prompt", prompt.encode()),
+        ("duration", str(duration).encode()),
+        ("aspect_ratio", str(aspect_ratio).encode()),
+        ("resolution", str(resolution).encode()),
+        ("mode", str(mode).encode()),
+        ("start_frame", start_frame or b""),
+    ]
+    fields += [("ref", ref) for ref in refs]
+    for name, data in fields:
+        digest.update(name.encode())
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _cache_path(key: str, suffix: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}{suffix}"
+
+
+def _digest_path(cached: Path) -> Path:
+    return cached.with_name(f"{cached.name}.sha256")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stamp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.key")
+
+
+def _place(src: Path, dest: Path) -> None:
+    """Hard-link (or copy) src to dest atomically."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def read_stamp(path: Path) -> str | None:
+    try:
+        return _stamp_path(path).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def write_stamp(path: Path, key: str) -> None:
+    _stamp_path(path).write_text(key)
+
+
+def is_current(path: Path, key: str) -> bool:
+    """True if `path` exists and was produced from `key` (or predates stamping)."""
+    if not path.exists():
+        return False
+    stamp = read_stamp(path)
+    return stamp is None or stamp == key
+
+
+def fetch(key: str, dest: Path) -> bool:
+    """Materialize a cached output at `dest`. Returns False on a cache miss or a corrupted entry."""
+    cached = _cache_path(key, dest.suffix)
+    if not cached.exists():
+        return False
+    digest_path = _digest_path(cached)
+    if digest_path.exists() and file_sha256(cached) != digest_path.read_text().strip():
+        cached.unlink(missing_ok=True)
+        digest_path.unlink(missing_ok=True)
+        return False
+    _place(cached, dest)
+    write_stamp(dest, key)
+    return True
+
+
+def store(key: str, path: Path, sha256: str | None = None) -> None:
+    """Add a freshly generated output to the cache and stamp it with its key.
+
+    `sha256` is the digest computed while the output was written; cache hits
+    are checked against it.
+    """
+    cached = _cache_path(key, path.suffix)
+    _place(path, cached)
+    if sha256 is not None:
+        _digest_path(cached).write_text(sha256)
+    write_stamp(path, key)
@@ -0,0 +1,141 @@
+"""Stream generated videos to disk in constant memory.
+
+`download_video` writes a generated video to a hidden `.part` file next to
+`dest` (one per source URI) in fixed-size chunks and hashes the data as it
+goes. A partial file left by an interrupted download is resumed with an HTTP
+range request (or a ranged GCS read) instead of starting over. The part file
+is checked against the size the server announced and only then renamed onto
+`dest`, so a clip in raw_clips/ is always complete. Callers that cache the
+clip store the returned sha256 with it (see `content_cache.store`), and it
+is checked whenever the cached copy is reused.
+
+Sources:
+  - Gemini API: the video's `uri` is fetched directly with the API key.
+  - Vertex AI: `gs://` URIs are read through google-cloud-storage; inline
+    `video_bytes` are written out as-is.
+"""
+
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+
+import httpx
+
+CHUNK_SIZE = 1024 * 1024
+GEMINI_FILES_URL = "https://generativelanguage.googleapis.com/v1beta/files"
+DOWNLOAD_TIMEOUT_SECONDS = 300
+
+
+class DownloadError(RuntimeError):
+    """The download ended before the announced size was received."""
+
+
+def _part_path(dest: Path, source: str) -> Path:
+    source_id = hashlib.sha1(source.encode()).hexdigest()[:12]
+    return dest.with_name(f".{dest.name}.{source_id}.part")
+
+
+def _hash_existing(part: Path) -> tuple:
+    """sha256 state and size of an existing partial download."""
+    digest = hashlib.sha256()
+    size = 0
+    if part.exists():
+        with open(part, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+    return digest, size
+
+
+def _media_url(uri: str) -> str:
+    if uri.startswith("http://") or uri.startswith("https://"):
+        return uri
+    name = uri.split("files/", 1)[-1]
+    return f"{GEMINI_FILES_URL}/{name}:download?alt=media"
+
+
+async def _stream_http(url: str, part: Path, api_key: str | None) -> str:
+    digest, offset = _hash_existing(part)
+    headers = {"x-goog-api-key": api_key} if api_key else {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+
+    async with httpx.AsyncClient(timeout=DOWNLOAD_TIMEOUT_SECONDS, follow_redirects=True) as http:
+        async with http.stream("GET", url, headers=headers) as response:
+            if response.status_code == 416:  # part file already complete
+                return digest.hexdigest()
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                # Server ignored the range; start over
+                digest, offset = hashlib.sha256(), 0
+            expected = response.headers.get("content-length")
+            expected = offset + int(expected) if expected is not None else None
+
+            with open(part, "ab" if offset else "wb") as f:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    offset += len(chunk)
+
+    if expected is not None and offset != expected:
+        raise DownloadError(f"received {offset} of {expected} bytes from {url}")
+    return digest.hexdigest()
+
+
+def _stream_gcs(uri: str, part: Path) -> str:
+    from google.cloud import storage
+
+    digest, offset = _hash_existing(part)
+    bucket_name, blob_path = uri[5:].split("/", 1)
+    blob = storage.Client().bucket(bucket_name).get_blob(blob_path)
+    if blob is None:
+        raise DownloadError(f"{uri} not found")
+    if offset > blob.size:
+        digest, offset = hashlib.sha256(), 0
+
+    with open(part, "ab" if offset else "wb") as f:
+        while offset < blob.size:
+            end = min(offset + CHUNK_SIZE, blob.size) - 1
+            chunk = blob.download_as_bytes(start=offset, end=end)
+            if not chunk:
+                break
+            f.write(chunk)
+            digest.update(chunk)
+            offset += len(chunk)
+
+    if offset != blob.size:
+        raise DownloadError(f"received {offset} of {blob.size} bytes from {uri}")
+    return digest.hexdigest()
+
+
+def _write_inline(data: bytes, part: Path) -> str:
+    with open(part, "wb") as f:
+        for start in range(0, len(data), CHUNK_SIZE):
+            f.write(data[start:start + CHUNK_SIZE])
+    return hashlib.sha256(data).hexdigest()
+
+
+async def download_video(video, dest: Path, api_key: str | None = None) -> str:
+    """Stream `video` (a `types.Video`) to `dest` atomically. Returns the sha256 of the file.
+
+    `api_key` defaults to GEMINI_API_KEY / GOOGLE_API_KEY, like `genai.Client()`.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = _part_path(dest, video.uri or "inline")
+
+    if getattr(video, "video_bytes", None):
+        digest = _write_inline(video.video_bytes, part)
+    elif video.uri and video.uri.startswith("gs://"):
+        digest = await asyncio.to_thread(_stream_gcs, video.uri, part)
+    elif video.uri:
+        api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        digest = await _stream_http(_media_url(video.uri), part, api_key)
+    else:
+        raise DownloadError("generated video has neither bytes nor a URI")
+
+    os.replace(part, dest)
+    for stale in dest.parent.glob(f".{dest.name}.*.part"):
+        stale.unlink(missing_ok=True)
+    return digest
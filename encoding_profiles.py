@@ -0,0 +1,81 @@
+"""Named encoder settings for assembler.py and aggregate.py.
+
+  draft    ultrafast, CRF 28 — for checking cuts and timing, not picture quality
+  review   medium, CRF 23 — libx264's own defaults
+  publish  slow, CRF 18, +faststart, and closed GOPs of half the frame rate
+           with two B-frames (YouTube's upload recommendation)
+
+config.yaml picks the default profile under `encoding.profile` and can
+adjust a profile's fields under `encoding.profiles.<name>`; --profile
+overrides the default for one run. A profile applies to everything that is
+encoded: stretches of video that are stream-copied keep their source's
+encoding, and only `faststart` affects them.
+"""
+
+import time
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+
+import yaml
+
+CONFIG_PATH = Path("config.yaml")
+DEFAULT_PROFILE = "publish"
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    name: str
+    preset: str
+    crf: int
+    gop_seconds: float | None = None  # fixed keyframe interval; None lets libx264 place keyframes
+    bframes: int | None = None
+    faststart: bool = False  # put the moov atom first so playback can start before the download ends
+
+    def describe(self) -> str:
+        return f"{self.name} ({self.preset}, CRF {self.crf})"
+
+    def video_args(self, fps: float, crf: int | None = None) -> list[str]:
+        """libx264 options other than the preset; `crf` overrides the profile's."""
+        args = ["-crf", str(self.crf if crf is None else crf)]
+        if self.gop_seconds:
+            gop = max(1, round(fps * self.gop_seconds))
+            args += ["-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0"]
+        if self.bframes is not None:
+            args += ["-bf", str(self.bframes)]
+        return args
+
+    def mux_args(self) -> list[str]:
+        return ["-movflags", "+faststart"] if self.faststart else []
+
+
+PROFILES = {
+    "draft": EncodingProfile("draft", preset="ultrafast", crf=28),
+    "review": EncodingProfile("review", preset="medium", crf=23),
+    "publish": EncodingProfile("publish", preset="slow", crf=18, gop_seconds=0.5, bframes=2, faststart=True),
+}
+
+
+def load(name: str | None = None, config_path: Path = CONFIG_PATH) -> EncodingProfile:
+    """The profile called `name`, or config.yaml's default, with config.yaml's overrides applied."""
+    config = {}
+    if config_path.exists():
+        config = (yaml.safe_load(config_path.read_text()) or {}).get("encoding") or {}
+    name = name or config.get("profile") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoding profile {name!r} (expected one of: {', '.join(PROFILES)})")
+
+    overrides = (config.get("profiles") or {}).get(name) or {}
+    known = {f.name for f in fields(EncodingProfile)} - {"name"}
+    unknown = set(overrides) - known
+    if unknown:
+        raise ValueError(f"{config_path}: unknown setting(s) for profile {name!r}: {', '.join(sorted(unknown))}")
+    return replace(PROFILES[name], **overrides)
+
+
+def report(profile: EncodingProfile, started: float, output_path: Path, seconds: float) -> None:
+    """Print how long `profile` took to produce `seconds` of video at `output_path`."""
+    elapsed = time.monotonic() - started
+    size = output_path.stat().st_size / 1024 / 1024
+    speed = seconds / elapsed if elapsed > 0 else float("inf")
+    print(f"  Profile {profile.describe()}: {seconds:.1f}s of video in {elapsed:.1f}s "
+          f"({speed:.2f}x realtime), {size:.1f} MB")
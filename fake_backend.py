@@ -0,0 +1,564 @@
+"""Offline stand-in for the Veo and Gemini APIs, for load testing the pipeline.
+
+Implements the parts of the google-genai surface the pipeline uses —
+`models.generate_videos`, `operations.get`, `files.download` and
+`models.generate_content`, sync and `aio` — against a local simulator that
+returns synthetic MP4s (real H.264/AAC, so frame extraction works), PNGs and
+story YAML. Generation latency is drawn from a configurable distribution,
+and 429s, failed operations and stuck operations (progress metadata that
+stops moving and never finishes) are injected at configurable rates.
+
+Two ways to use it (see `clients.make_client`):
+  - In-process:  INU_FAKE_BACKEND=1 python video_generator.py --story ...
+  - HTTP server: python fake_backend.py --port 8765
+                 INU_FAKE_BACKEND=http://127.0.0.1:8765 python video_generator.py --story ...
+    The real `genai.Client` talks to the server, so the SDK, the HTTP
+    polling and the streaming download are all exercised.
+
+Latency specs are "fixed:S", "uniform:LO:HI" or "lognormal:MEDIAN:SIGMA"
+(seconds), scaled by INU_FAKE_TIME_SCALE (e.g. 0.05 for a quick run).
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from google.genai import errors, types
+
+import clients
+import mp4
+
+VIDEO_FPS = 24
+KEYFRAME_INTERVAL = VIDEO_FPS  # frames per GOP, so the assembler has keyframes to cut at
+AUDIO_SAMPLE_RATE = 48000
+CLIP_BYTES = 4 * 1024 * 1024  # padded size of a synthetic clip, roughly a real 8s Veo clip
+STUCK_PROGRESS = 40  # percent at which a stuck operation stops advancing
+IMAGE_LONG_SIDE = 1024
+
+
+def parse_latency(spec: str):
+    """Return a sampler `f(rng) -> seconds` for a latency spec string."""
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"bad latency spec '{spec}' (expected fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA)")
+
+
+@dataclass
+class FakeConfig:
+    video_latency: str = "lognormal:90:0.35"
+    image_latency: str = "lognormal:12:0.3"
+    text_latency: str = "lognormal:40:0.3"
+    time_scale: float = 1.0
+    rate_429: float = 0.0
+    failure_rate: float = 0.0
+    stuck_rate: float = 0.0
+    clip_bytes: int = CLIP_BYTES
+    seed: int | None = None
+
+    @classmethod
+    def from_env(cls) -> "FakeConfig":
+        config = cls()
+        config.video_latency = os.getenv("INU_FAKE_VIDEO_LATENCY", config.video_latency)
+        config.image_latency = os.getenv("INU_FAKE_IMAGE_LATENCY", config.image_latency)
+        config.text_latency = os.getenv("INU_FAKE_TEXT_LATENCY", config.text_latency)
+        config.time_scale = float(os.getenv("INU_FAKE_TIME_SCALE", config.time_scale))
+        config.rate_429 = float(os.getenv("INU_FAKE_429_RATE", config.rate_429))
+        config.failure_rate = float(os.getenv("INU_FAKE_FAILURE_RATE", config.failure_rate))
+        config.stuck_rate = float(os.getenv("INU_FAKE_STUCK_RATE", config.stuck_rate))
+        seed = os.getenv("INU_FAKE_SEED")
+        config.seed = int(seed) if seed else None
+        return config
+
+
+# ---------------------------------------------------------------------------
+# Synthetic media
+# ---------------------------------------------------------------------------
+
+def video_size(aspect_ratio: str, resolution: str) -> tuple[int, int]:
+    """(width, height) Veo produces for an aspect ratio and resolution."""
+    lines = mp4.RESOLUTION_LINES.get(resolution, 720)
+    long_side = lines * 16 // 9
+    return (lines, long_side) if aspect_ratio == "9:16" else (long_side, lines)
+
+
+def _pad(data: bytes, size: int) -> bytes:
+    """Append a top-level `free` box so the file reaches `size` bytes."""
+    padding = size - len(data)
+    if padding < 8:
+        return data
+    return data + struct.pack(">I4s", padding, b"free") + bytes(padding - 8)
+
+
+@lru_cache(maxsize=16)
+def synthetic_clip(duration: int, width: int, height: int, size: int = CLIP_BYTES) -> bytes:
+    """An H.264 + AAC MP4 of a slowly changing colour field with a silent stereo track."""
+    import av
+    import numpy as np
+
+    out = io.BytesIO()
+    with av.open(out, "w", format="mp4") as container:
+        video = container.add_stream("libx264", rate=VIDEO_FPS)
+        video.width, video.height, video.pix_fmt = width, height, "yuv420p"
+        video.options = {"preset": "ultrafast", "g": str(KEYFRAME_INTERVAL)}
+        audio = container.add_stream("aac", rate=AUDIO_SAMPLE_RATE)
+
+        frame_rgb = np.zeros((height, width, 3), np.uint8)
+        frame_rgb[..., 1:] = (120, 200)
+        for i in range(duration * VIDEO_FPS):
+            frame_rgb[..., 0] = i * 3 % 256
+            for packet in video.encode(av.VideoFrame.from_ndarray(frame_rgb, format="rgb24")):
+                container.mux(packet)
+        container.mux(video.encode())
+
+        samples = 1024
+        silence = np.zeros((2, samples), np.float32)
+        for i in range(duration * AUDIO_SAMPLE_RATE // samples):
+            frame = av.AudioFrame.from_ndarray(silence, format="fltp", layout="stereo")
+            frame.sample_rate, frame.pts = AUDIO_SAMPLE_RATE, i * samples
+            for packet in audio.encode(frame):
+                container.mux(packet)
+        container.mux(audio.encode())
+    return _pad(out.getvalue(), size)
+
+
+def synthetic_image(prompt: str, aspect_ratio: str | None) -> bytes:
+    """A PNG in a colour derived from the prompt, at the requested aspect ratio."""
+    from PIL import Image
+
+    w, h = (int(x) for x in (aspect_ratio or "1:1").split(":"))
+    scale = IMAGE_LONG_SIDE / max(w, h)
+    colour = tuple(hashlib.sha256(prompt.encode()).digest()[:3])
+    out = io.BytesIO()
+    Image.new("RGB", (round(w * scale), round(h * scale)), colour).save(out, format="PNG")
+    return out.getvalue()
+
+
+def synthetic_story(prompt: str) -> str:
+    """A fenced story YAML with as many shots as the story prompt asks for."""
+    match = re.search(r"(\d+) shots total", prompt)
+    num_shots = int(match.group(1)) if match else 15
+    lines = ["```yaml", "title: Synthetic Story", "concept: A placeholder story from the fake backend.", "shots:"]
+    for i in range(1, num_shots + 1):
+        lines.append(f"  - id: {i}")
+        lines.append(f'    description: "Synthetic shot {i}."')
+        if i == 1:
+            lines += ["    mode: t2v", "    reference_images: []"]
+        else:
+            lines.append("    mode: i2v")
+    lines.append("```")
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Simulator
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Operation:
+    name: str
+    ready_at: float
+    duration: int
+    width: int
+    height: int
+    error: dict | None = None
+    stuck: bool = False
+    submitted_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def file_id(self) -> str:
+        """Generated files are named after their operation's id (lowercase hex, as the SDK expects)."""
+        return self.name.rsplit("/", 1)[-1]
+
+    def progress(self) -> int:
+        """Percent complete for the operation's metadata; a stuck operation freezes at STUCK_PROGRESS."""
+        span = max(self.ready_at - self.submitted_at, 1e-6)
+        percent = min(99, int(100 * (time.monotonic() - self.submitted_at) / span))
+        return min(percent, STUCK_PROGRESS) if self.stuck else percent
+
+
+def _api_error(code: int, status: str, message: str) -> errors.APIError:
+    body = {"error": {"code": code, "message": message, "status": status}}
+    return errors.ClientError(code, body) if code < 500 else errors.ServerError(code, body)
+
+
+@dataclass
+class FakeBackend:
+    """Shared simulator state behind both the in-process client and the HTTP server."""
+
+    config: FakeConfig = field(default_factory=FakeConfig)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._operations: dict[str, _Operation] = {}
+        self._files: dict[str, _Operation] = {}
+        self._samplers = {
+            "video": parse_latency(self.config.video_latency),
+            "image": parse_latency(self.config.image_latency),
+            "text": parse_latency(self.config.text_latency),
+        }
+        self.stats = {
+            "submitted": 0, "rate_limited": 0, "failed": 0, "stuck": 0, "polls": 0, "downloads": 0, "content": 0,
+        }
+
+    def _draw(self, kind: str) -> tuple[float, bool, bool]:
+        """(latency, throttled, failed) for one request."""
+        with self._lock:
+            latency = self._samplers[kind](self._rng) * self.config.time_scale
+            throttled = self._rng.random() < self.config.rate_429
+            failed = self._rng.random() < self.config.failure_rate
+            if throttled:
+                self.stats["rate_limited"] += 1
+        return latency, throttled, failed
+
+    def submit_video(self, model: str, duration: int, aspect_ratio: str, resolution: str) -> str:
+        latency, throttled, failed = self._draw("video")
+        if throttled:
+            raise _api_error(429, "RESOURCE_EXHAUSTED", f"Quota exceeded for {model} (injected by fake backend)")
+        width, height = video_size(aspect_ratio, resolution)
+        name = f"models/{model}/operations/{uuid.uuid4().hex[:16]}"
+        error = {"code": 13, "message": "Video generation failed (injected by fake backend)"} if failed else None
+        with self._lock:
+            stuck = not failed and self._rng.random() < self.config.stuck_rate
+            op = _Operation(name, time.monotonic() + latency, duration, width, height, error, stuck)
+            self._operations[name] = self._files[op.file_id] = op
+            self.stats["submitted"] += 1
+            self.stats["failed"] += bool(failed)
+            self.stats["stuck"] += stuck
+        return name
+
+    def poll(self, name: str) -> tuple[_Operation, bool]:
+        """The operation and whether it has finished."""
+        with self._lock:
+            self.stats["polls"] += 1
+            op = self._operations.get(name)
+        if op is None:
+            raise _api_error(404, "NOT_FOUND", f"Operation {name} not found")
+        return op, not op.stuck and time.monotonic() >= op.ready_at
+
+    def clip(self, file_id: str) -> bytes:
+        with self._lock:
+            op = self._files.get(file_id)
+            self.stats["downloads"] += 1
+        if op is None:
+            raise _api_error(404, "NOT_FOUND", f"File {file_id} not found")
+        return synthetic_clip(op.duration, op.width, op.height, self.config.clip_bytes)
+
+    def content(self, model: str, prompt: str, wants_image: bool, aspect_ratio: str | None) -> tuple[float, object]:
+        """(latency, result) for a generate_content call; result is PNG bytes or text."""
+        latency, throttled, failed = self._draw("image" if wants_image else "text")
+        with self._lock:
+            self.stats["content"] += 1
+        if throttled:
+            raise _api_error(429, "RESOURCE_EXHAUSTED", f"Quota exceeded for {model} (injected by fake backend)")
+        if failed:
+            raise _api_error(500, "INTERNAL", "Internal error (injected by fake backend)")
+        if wants_image:
+            return latency, synthetic_image(prompt, aspect_ratio)
+        return latency, synthetic_story(prompt)
+
+
+# ---------------------------------------------------------------------------
+# In-process client
+# ---------------------------------------------------------------------------
+
+def _config_value(config, name: str, default=None):
+    if config is None:
+        return default
+    value = config.get(name) if isinstance(config, dict) else getattr(config, name, None)
+    return default if value is None else value
+
+
+def _prompt_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(c for c in contents if isinstance(c, str))
+
+
+def _wants_image(config) -> bool:
+    modalities = _config_value(config, "response_modalities", [])
+    return any(str(m).upper().endswith("IMAGE") for m in modalities)
+
+
+def _image_aspect(config) -> str | None:
+    return _config_value(_config_value(config, "image_config"), "aspect_ratio")
+
+
+def _content_response(result) -> types.GenerateContentResponse:
+    if isinstance(result, bytes):
+        part = types.Part.from_bytes(data=result, mime_type="image/png")
+    else:
+        part = types.Part(text=result)
+    return types.GenerateContentResponse(candidates=[
+        types.Candidate(content=types.Content(role="model", parts=[part]), finish_reason="STOP"),
+    ])
+
+
+class _Models:
+    def __init__(self, backend: FakeBackend) -> None:
+        self._backend = backend
+
+    def _submit(self, model, config) -> types.GenerateVideosOperation:
+        name = self._backend.submit_video(
+            model,
+            duration=int(_config_value(config, "duration_seconds", 8)),
+            aspect_ratio=_config_value(config, "aspect_ratio", "16:9"),
+            resolution=_config_value(config, "resolution", "720p"),
+        )
+        return types.GenerateVideosOperation(name=name, done=False)
+
+    def _content(self, model, contents, config):
+        return self._backend.content(model, _prompt_text(contents), _wants_image(config), _image_aspect(config))
+
+    def generate_videos(self, *, model, prompt=None, image=None, video=None, source=None, config=None):
+        return self._submit(model, config)
+
+    def generate_content(self, *, model, contents, config=None):
+        latency, result = self._content(model, contents, config)
+        time.sleep(latency)
+        return _content_response(result)
+
+
+class _AsyncModels(_Models):
+    async def generate_videos(self, *, model, prompt=None, image=None, video=None, source=None, config=None):
+        return self._submit(model, config)
+
+    async def generate_content(self, *, model, contents, config=None):
+        latency, result = self._content(model, contents, config)
+        await asyncio.sleep(latency)
+        return _content_response(result)
+
+
+class _Operations:
+    def __init__(self, backend: FakeBackend) -> None:
+        self._backend = backend
+
+    def get(self, operation) -> types.GenerateVideosOperation:
+        op, done = self._backend.poll(operation.name)
+        if not done:
+            return types.GenerateVideosOperation(name=op.name, done=False, metadata={"progressPercent": op.progress()})
+        if op.error:
+            return types.GenerateVideosOperation(name=op.name, done=True, error=op.error)
+        # Inline bytes, like Vertex AI without an output bucket
+        video = types.Video(
+            uri=f"fake://files/{op.file_id}",
+            video_bytes=self._backend.clip(op.file_id),
+            mime_type="video/mp4",
+        )
+        return types.GenerateVideosOperation(
+            name=op.name, done=True,
+            response=types.GenerateVideosResponse(generated_videos=[types.GeneratedVideo(video=video)]),
+        )
+
+
+class _AsyncOperations(_Operations):
+    async def get(self, operation) -> types.GenerateVideosOperation:
+        return super().get(operation)
+
+
+class _Files:
+    def __init__(self, backend: FakeBackend) -> None:
+        self._backend = backend
+
+    def _read(self, file) -> bytes:
+        uri = file.uri if isinstance(file, types.Video) else str(file)
+        return self._backend.clip(uri.rsplit("/", 1)[-1])
+
+    def download(self, *, file, config=None) -> bytes:
+        data = self._read(file)
+        if isinstance(file, types.Video):
+            file.video_bytes = data
+        return data
+
+
+class _AsyncFiles(_Files):
+    async def download(self, *, file, config=None) -> bytes:
+        return self._read(file)
+
+
+class FakeClient:
+    """Drop-in for `genai.Client` covering the calls the pipeline makes."""
+
+    def __init__(self, config: FakeConfig | None = None, backend: FakeBackend | None = None) -> None:
+        self.backend = backend or FakeBackend(config or FakeConfig.from_env())
+        self.models = _Models(self.backend)
+        self.operations = _Operations(self.backend)
+        self.files = _Files(self.backend)
+        self.aio = SimpleNamespace(
+            models=_AsyncModels(self.backend),
+            operations=_AsyncOperations(self.backend),
+            files=_AsyncFiles(self.backend),
+        )
+
+
+# ---------------------------------------------------------------------------
+# HTTP server (Gemini API wire format)
+# ---------------------------------------------------------------------------
+
+def _make_handler(backend: FakeBackend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict | None = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, payload: dict) -> None:
+            self._send(status, json.dumps(payload).encode())
+
+        def _error(self, e: errors.APIError) -> None:
+            self._json(e.code, e.details)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self) -> None:
+            path = self.path.split("?", 1)[0]
+            try:
+                if m := re.fullmatch(r"/v1beta/models/([^/:]+):predictLongRunning", path):
+                    body = self._body()
+                    params = body.get("parameters", {})
+                    name = backend.submit_video(
+                        m.group(1),
+                        duration=int(params.get("durationSeconds", 8)),
+                        aspect_ratio=params.get("aspectRatio", "16:9"),
+                        resolution=params.get("resolution", "720p"),
+                    )
+                    self._json(200, {"name": name})
+                elif m := re.fullmatch(r"/v1beta/models/([^/:]+):generateContent", path):
+                    body = self._body()
+                    prompt = "\n".join(
+                        part["text"] for c in body.get("contents", []) for part in c.get("parts", []) if "text" in part
+                    )
+                    gen_config = body.get("generationConfig", {})
+                    wants_image = "IMAGE" in [m.upper() for m in gen_config.get("responseModalities", [])]
+                    aspect = gen_config.get("imageConfig", {}).get("aspectRatio")
+                    latency, result = backend.content(m.group(1), prompt, wants_image, aspect)
+                    time.sleep(latency)
+                    if isinstance(result, bytes):
+                        part = {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(result).decode()}}
+                    else:
+                        part = {"text": result}
+                    self._json(200, {"candidates": [{"content": {"role": "model", "parts": [part]}, "finishReason": "STOP"}]})
+                else:
+                    self._json(404, {"error": {"code": 404, "message": f"no route for {path}", "status": "NOT_FOUND"}})
+            except errors.APIError as e:
+                self._error(e)
+
+        def do_GET(self) -> None:
+            path = self.path.split("?", 1)[0]
+            try:
+                # The sync SDK only strips https:// URIs, so an http:// one arrives whole
+                if m := re.fullmatch(r"/v1beta/files/(?:.*/files/)?([a-z0-9]+):download", path):
+                    self._download(m.group(1))
+                elif m := re.fullmatch(r"/v1beta/(models/[^/]+/operations/[^/]+)", path):
+                    op, done = backend.poll(m.group(1))
+                    payload = {"name": op.name, "done": done}
+                    if not done:
+                        payload["metadata"] = {"progressPercent": op.progress()}
+                    elif op.error:
+                        payload["error"] = op.error
+                    else:
+                        host, port = self.server.server_address[:2]
+                        uri = f"http://{host}:{port}/v1beta/files/{op.file_id}:download?alt=media"
+                        payload["response"] = {"generateVideoResponse": {"generatedSamples": [{"video": {"uri": uri}}]}}
+                    self._json(200, payload)
+                else:
+                    self._json(404, {"error": {"code": 404, "message": f"no route for {path}", "status": "NOT_FOUND"}})
+            except errors.APIError as e:
+                self._error(e)
+
+        def _download(self, file_id: str) -> None:
+            data = backend.clip(file_id)
+            start = 0
+            if m := re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", "")):
+                start = int(m.group(1))
+                if start >= len(data):
+                    self._send(416, b"", headers={"Content-Range": f"bytes */{len(data)}"})
+                    return
+                self._send(206, data[start:], "video/mp4",
+                           {"Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"})
+                return
+            self._send(200, data, "video/mp4")
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, config: FakeConfig | None = None) -> ThreadingHTTPServer:
+    """Create (but don't start) a fake API server. Call `serve_forever()` on the result."""
+    backend = FakeBackend(config or FakeConfig.from_env())
+    server = ThreadingHTTPServer((host, port), _make_handler(backend))
+    server.backend = backend
+    return server
+
+
+def main() -> None:
+    defaults = FakeConfig.from_env()
+    parser = argparse.ArgumentParser(description="Run a local fake Veo/Gemini API server for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--video_latency", default=defaults.video_latency, help="Latency spec for video operations.")
+    parser.add_argument("--image_latency", default=defaults.image_latency, help="Latency spec for image generation.")
+    parser.add_argument("--text_latency", default=defaults.text_latency, help="Latency spec for text generation.")
+    parser.add_argument("--time_scale", type=float, default=defaults.time_scale, help="Multiply every latency by this.")
+    parser.add_argument("--rate_429", type=float, default=defaults.rate_429, help="Fraction of requests answered with 429.")
+    parser.add_argument("--failure_rate", type=float, default=defaults.failure_rate, help="Fraction of requests that fail.")
+    parser.add_argument("--stuck_rate", type=float, default=defaults.stuck_rate,
+                        help="Fraction of video operations that stop making progress and never finish.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        video_latency=args.video_latency,
+        image_latency=args.image_latency,
+        text_latency=args.text_latency,
+        time_scale=args.time_scale,
+        rate_429=args.rate_429,
+        failure_rate=args.failure_rate,
+        stuck_rate=args.stuck_rate,
+        seed=args.seed,
+    )
+    server = serve(args.host, args.port, config)
+    print(f"Fake Veo/Gemini backend listening on http://{args.host}:{args.port}")
+    print(f"  export {clients.FAKE_BACKEND_ENV}=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Stats: {server.backend.stats}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Extract the I2V start frame from the tail of a clip, in-process.
+
+The duration comes from the MP4 header (see `mp4`), and PyAV seeks to the
+keyframe before the target and decodes only the frames around it, so the rest
+of the clip is never read. Rather than taking the single frame
+at the target, every frame within CANDIDATE_WINDOW_SECONDS of it is scored —
+sharpness (variance of the Laplacian), exposure, and difference from the
+frame before it — and the best one is used, so the next shot doesn't start
+from a motion-blurred or mid-transition frame.
+
+The chosen frame is cached next to the clip (`<id>.last.jpg` plus
+`<id>.last.json`, which records its timestamp and the clip's size and
+modification time), so resumed runs don't have to extract it again and the
+assembler can cut the clip exactly where the next shot picks up. A
+regenerated clip has a new modification time, so its frame is extracted
+again even if it happens to be the same size.
+
+If PyAV is not installed, extraction falls back to ffmpeg (the binary MoviePy
+bundles, see `smartcut.ffmpeg_exe`) at the target.
+"""
+
+import io
+import json
+import subprocess
+from pathlib import Path
+
+import mp4
+import smartcut
+
+JPEG_QUALITY = 95
+CANDIDATE_WINDOW_SECONDS = 0.5  # candidates are taken from target ± this
+SCORE_WIDTH = 320  # frames are scored at this width
+SHARPNESS_WEIGHT = 1.0
+EXPOSURE_WEIGHT = 0.5
+MOTION_WEIGHT = 0.5
+
+
+def frame_paths(clip_path: Path) -> tuple[Path, Path]:
+    """(jpeg, metadata) paths of the cached start frame for `clip_path`."""
+    return clip_path.with_suffix(".last.jpg"), clip_path.with_suffix(".last.json")
+
+
+def _clip_stamp(clip_path: Path) -> dict:
+    """What identifies this version of the clip in the cached metadata."""
+    stat = clip_path.stat()
+    return {"clip_size": stat.st_size, "clip_mtime_ns": stat.st_mtime_ns}
+
+
+def _matches(meta: dict, stamp: dict) -> bool:
+    return all(meta.get(name) == value for name, value in stamp.items())
+
+
+def score_frames(grays: list) -> list[float]:
+    """Score grayscale frames (float arrays in [0, 1]) as I2V start frames; higher is better.
+
+    Sharpness is the variance of the 4-neighbour Laplacian, exposure rewards a
+    mid-range mean with few clipped pixels, and motion is the mean absolute
+    difference from the previous frame. Sharpness and motion are normalized
+    across the candidates, so only their relative values matter.
+    """
+    import numpy as np
+
+    stack = np.stack(grays)
+    lap = (
+        -4 * stack[:, 1:-1, 1:-1]
+        + stack[:, :-2, 1:-1] + stack[:, 2:, 1:-1]
+        + stack[:, 1:-1, :-2] + stack[:, 1:-1, 2:]
+    )
+    sharpness = lap.reshape(len(stack), -1).var(axis=1)
+    clipped = ((stack < 0.02) | (stack > 0.98)).reshape(len(stack), -1).mean(axis=1)
+    exposure = 1 - 2 * np.abs(stack.reshape(len(stack), -1).mean(axis=1) - 0.5) - clipped
+    motion = np.zeros(len(stack))
+    motion[1:] = np.abs(np.diff(stack, axis=0)).reshape(len(stack) - 1, -1).mean(axis=1)
+    motion[0] = motion[1] if len(stack) > 1 else 0.0
+
+    scores = (
+        SHARPNESS_WEIGHT * sharpness / max(sharpness.max(), 1e-9)
+        + EXPOSURE_WEIGHT * exposure
+        - MOTION_WEIGHT * motion / max(motion.max(), 1e-9)
+    )
+    return scores.tolist()
+
+
+def _decode_with_av(source: str, timestamp: float) -> tuple[bytes, float]:
+    """Decode the candidates around `timestamp` and return (JPEG of the best, its timestamp)."""
+    import av
+
+    with av.open(source) as container:
+        stream = container.streams.video[0]
+        start = max(0.0, timestamp - CANDIDATE_WINDOW_SECONDS)
+        # Seek lands on the keyframe at or before the window; decode forward from there
+        container.seek(int(start / stream.time_base), stream=stream, backward=True)
+        candidates = []
+        last = None
+        for frame in container.decode(stream):
+            if frame.time is None:
+                continue
+            last = frame
+            if frame.time > timestamp + CANDIDATE_WINDOW_SECONDS:
+                break
+            if frame.time >= start:
+                candidates.append(frame)
+        if not candidates:
+            if last is None:
+                raise RuntimeError("no video frame decoded near the tail")
+            candidates = [last]
+
+        height = max(2, round(SCORE_WIDTH * candidates[0].height / candidates[0].width))
+        grays = [
+            f.reformat(width=SCORE_WIDTH, height=height, format="gray").to_ndarray().astype("float32") / 255
+            for f in candidates
+        ]
+        scores = score_frames(grays)
+        chosen = candidates[scores.index(max(scores))]
+        out = io.BytesIO()
+        chosen.to_image().save(out, format="JPEG", quality=JPEG_QUALITY)
+        return out.getvalue(), float(chosen.time)
+
+
+def _decode_with_ffmpeg(clip_path: Path, timestamp: float) -> bytes:
+    frame_result = subprocess.run(
+        [smartcut.ffmpeg_exe(), "-y", "-ss", str(timestamp), "-i", str(clip_path),
+         "-frames:v", "1", "-q:v", "2", "-f", "image2pipe", "-vcodec", "mjpeg", "pipe:1"],
+        capture_output=True, check=True,
+    )
+    return frame_result.stdout
+
+
+def read_frame_timestamp(clip_path: str | Path) -> float | None:
+    """Timestamp of the cached start frame taken from `clip_path`, or None if there is none for this clip."""
+    clip_path = Path(clip_path)
+    jpg_path, meta_path = frame_paths(clip_path)
+    try:
+        meta = json.loads(meta_path.read_text())
+        if _matches(meta, _clip_stamp(clip_path)) and jpg_path.exists():
+            return float(meta["timestamp"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def extract_last_frame(clip_path: str | Path, offset_from_end: float) -> bytes:
+    """JPEG bytes of the best frame around `offset_from_end` seconds before the end of the clip.
+
+    The result is cached next to the clip and reused while the clip is unchanged.
+    """
+    clip_path = Path(clip_path)
+    jpg_path, meta_path = frame_paths(clip_path)
+    stamp = _clip_stamp(clip_path)
+
+    try:
+        meta = json.loads(meta_path.read_text())
+        if meta.get("offset") == offset_from_end and _matches(meta, stamp) and jpg_path.exists():
+            return jpg_path.read_bytes()
+    except (OSError, ValueError):
+        pass
+
+    duration = mp4.read_duration(clip_path)
+    timestamp = max(0.0, duration - offset_from_end)
+    try:
+        frame, timestamp = _decode_with_av(str(clip_path), timestamp)
+    except ImportError:
+        frame = _decode_with_ffmpeg(clip_path, timestamp)
+
+    jpg_path.write_bytes(frame)
+    meta_path.write_text(json.dumps({
+        "offset": offset_from_end,
+        "timestamp": timestamp,
+        **stamp,
+    }))
+    return frame
@@ -0,0 +1,111 @@
+"""Hedge slow video operations with a duplicate request.
+
+Veo latency has a long tail, and because I2V chains are serial one slow
+operation stalls the rest of its story. When an operation is still running
+past a chosen percentile of the historical completion time for its
+model/resolution/duration/mode (see `latency_model`), `Hedger` submits an
+identical request alongside it. Whichever finishes first with a video is
+kept; the other is no longer polled (and is marked discarded in the journal).
+
+Duplicates cost a full generation each, so the number a run may submit is
+capped by `budget`.
+"""
+
+import asyncio
+import time
+
+import retry_policy
+from latency_model import LatencyModel
+
+DEFAULT_HEDGE_BUDGET = 3  # extra generations per run
+HEDGE_MIN_SAMPLES = 10  # history a key needs before its percentile is trusted
+
+
+def _usable(task: asyncio.Task) -> bool:
+    """True if a finished poll task produced an operation with a video."""
+    if task.cancelled() or task.exception() is not None:
+        return False
+    try:
+        retry_policy.generated_video(task.result())
+    except retry_policy.OperationFailed:
+        return False
+    return True
+
+
+class Hedger:
+    """Per-run hedging policy and budget, shared by every shot of the run."""
+
+    def __init__(self, latency: LatencyModel, percentile: float, budget: int = DEFAULT_HEDGE_BUDGET) -> None:
+        self.latency = latency
+        self.percentile = percentile
+        self.budget = budget
+        self.used = 0
+        self.won = 0
+
+    def threshold(self, key: str) -> float | None:
+        """Seconds after which an operation under `key` is hedged, or None without enough history."""
+        if len(self.latency.samples(key)) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(key, self.percentile)
+
+    def _take(self) -> bool:
+        if self.used >= self.budget:
+            return False
+        self.used += 1
+        return True
+
+    async def wait(self, poller, client, operation, key: str, submit, job=None,
+                   submitted_at: float | None = None, deadline: float | None = None):
+        """Wait for `operation` like `OperationPoller.wait`, hedging it with `submit()` if it runs long.
+
+        `submit` is a coroutine function that submits an identical request
+        (rate limiting included) and returns the new operation.
+        `submitted_at` is the original's submit time (time.time()), so a
+        re-attached operation is hedged and timed from its real start.
+        `deadline` applies to each request separately. Returns the final state of
+        whichever operation is kept.
+        """
+        tag = f"Shot {job.shot_id}" if job is not None else "Operation"
+        primary = asyncio.create_task(poller.wait(client, operation, key, deadline, submitted_at))
+        threshold = self.threshold(key)
+        if threshold is None:
+            return await primary
+
+        elapsed = time.time() - submitted_at if submitted_at is not None else 0.0
+        done, _ = await asyncio.wait({primary}, timeout=max(0.0, threshold - elapsed))
+        if done or not self._take():
+            return await primary
+
+        print(f"  {tag}: still running after p{self.percentile:g} ({threshold:.0f}s) — "
+              f"hedging with a duplicate request ({self.used}/{self.budget})")
+        try:
+            hedge_operation = await submit()
+        except Exception as e:
+            print(f"  {tag}: hedge submission failed, waiting on the original — {e}")
+            return await primary
+        if job is not None:
+            job.journal.record(hedge_operation.name, job.story, job.shot_id, job.prompt_hash, job.model)
+        hedge = asyncio.create_task(poller.wait(client, hedge_operation, key, deadline))
+        names = {primary: operation.name, hedge: hedge_operation.name}
+
+        pending = {primary, hedge}
+        winner = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Check every finished task, so a failure alongside the winner is still retrieved
+            usable = [t for t in done if _usable(t)]
+            if usable:
+                winner = usable[0]
+                break
+        for task in pending:
+            task.cancel()
+
+        kept = winner or primary
+        loser = hedge if kept is primary else primary
+        if kept is hedge:
+            self.won += 1
+            print(f"  {tag}: hedge finished first")
+        if job is not None:
+            job.operation = names[kept]
+            job.journal.mark(names[loser], "failed", "discarded hedge duplicate")
+        return await kept
@@ -0,0 +1,117 @@
+"""Durable journal of submitted generation operations.
+
+Every Veo operation is recorded in a local SQLite database as soon as it is
+submitted, together with the story, shot id and the request's content key
+(see `content_cache.content_key`). If the process dies or is interrupted
+while a shot is polling, the next run finds the still-running (or already
+finished) operation for the same request and re-attaches to it instead of
+paying for a brand new generation.
+
+Statuses: "running" (submitted, not yet resolved), "done" (finished, not yet
+saved to disk), "saved" (clip written — never resumed again), "failed".
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from google.genai import types
+
+JOURNAL_PATH = Path("output") / ".state" / "journal.sqlite3"
+RESUMABLE_STATUSES = ("running", "done")
+
+
+class JobJournal:
+    """SQLite-backed record of operations, shared by every run on this machine."""
+
+    def __init__(self, path: Path = JOURNAL_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " operation TEXT PRIMARY KEY,"
+                " story TEXT NOT NULL,"
+                " shot_id INTEGER NOT NULL,"
+                " prompt_hash TEXT NOT NULL,"
+                " model TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " error TEXT,"
+                " created REAL NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_shot ON jobs (story, shot_id, prompt_hash)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, operation: str, story: str, shot_id: int, prompt_hash: str, model: str,
+               created: float | None = None) -> None:
+        """Record a newly submitted operation; `created` is its submit time (time.time()), default now."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, 'running', NULL, ?, ?)",
+                (operation, story, shot_id, prompt_hash, model, created or now, now),
+            )
+
+    def mark(self, operation: str, status: str, error: str | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE operation = ?",
+                (status, error, time.time(), operation),
+            )
+
+    def find_resumable(self, story: str, shot_id: int, prompt_hash: str) -> tuple[str, float] | None:
+        """(operation, submit time) of the newest running/done operation for exactly this request, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT operation, created FROM jobs WHERE story = ? AND shot_id = ? AND prompt_hash = ?"
+                " AND status IN (?, ?) ORDER BY created DESC LIMIT 1",
+                (story, shot_id, prompt_hash, *RESUMABLE_STATUSES),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+
+class ShotJob:
+    """Journal bookkeeping for one shot's request within a run."""
+
+    def __init__(self, journal: JobJournal, story: str, shot_id: int, prompt_hash: str, model: str) -> None:
+        self.journal = journal
+        self.story = story
+        self.shot_id = shot_id
+        self.prompt_hash = prompt_hash
+        self.model = model
+        self.operation: str | None = None
+        self.submitted_at: float | None = None  # time.time() the current operation was submitted
+
+    async def resume(self, client):
+        """Re-attach to a journaled operation for this request. Returns it refreshed, or None."""
+        found = self.journal.find_resumable(self.story, self.shot_id, self.prompt_hash)
+        if found is None:
+            return None
+        name, created = found
+        try:
+            operation = await client.aio.operations.get(types.GenerateVideosOperation(name=name))
+        except Exception as e:
+            self.journal.mark(name, "failed", f"could not re-attach: {e}")
+            return None
+        self.operation = name
+        self.submitted_at = created
+        return operation
+
+    def submitted(self, operation: str) -> None:
+        self.operation = operation
+        self.submitted_at = time.time()
+        self.journal.record(operation, self.story, self.shot_id, self.prompt_hash, self.model, self.submitted_at)
+
+    def finished(self, status: str, error: str | None = None) -> None:
+        if self.operation is not None:
+            self.journal.mark(self.operation, status, error)
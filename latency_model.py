@@ -0,0 +1,125 @@
+"""Learned completion-time model for long-running generation operations.
+
+Every finished operation records how long it took under a key of
+(model, resolution, duration, mode). The samples are kept in a small SQLite
+database, like the rate limiter's buckets and the job journal, so concurrent
+runs add to one history without overwriting each other's samples and later
+runs start with a realistic expectation. The poller uses that expectation to
+poll sparsely while an operation is young and densely around the time it is
+expected to finish.
+"""
+
+import json
+import random
+import sqlite3
+import statistics
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+LATENCY_DB = Path("output") / ".state" / "latency.sqlite3"
+LEGACY_JSON_PATH = Path("output") / ".state" / "latency.json"  # imported once into an empty database
+MAX_SAMPLES_PER_KEY = 50
+DEFAULT_EXPECTED_SECONDS = 90.0  # prior for keys with no history yet
+
+MIN_POLL_SECONDS = 3.0
+MAX_POLL_SECONDS = 30.0
+POLL_JITTER = 0.15  # ± fraction applied to every delay
+
+
+def key_for(model: str, resolution: str | None, duration: int | None, mode: str) -> str:
+    return f"{model}|{resolution or '-'}|{duration or '-'}|{mode}"
+
+
+class LatencyModel:
+    """Per-key completion-time samples, persisted in the SQLite database at `path`."""
+
+    def __init__(self, path: Path = LATENCY_DB) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS samples ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " key TEXT NOT NULL,"
+                " seconds REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS samples_key ON samples (key, id)")
+            self._import_legacy(conn)
+        self._samples: dict[str, list[float]] = self._read()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _import_legacy(self, conn: sqlite3.Connection) -> None:
+        if self.path != LATENCY_DB or conn.execute("SELECT 1 FROM samples LIMIT 1").fetchone():
+            return
+        try:
+            data = json.loads(LEGACY_JSON_PATH.read_text())
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            conn.executemany(
+                "INSERT INTO samples (key, seconds) VALUES (?, ?)",
+                [(k, float(x)) for k, v in data.items() if isinstance(v, list) for x in v[-MAX_SAMPLES_PER_KEY:]],
+            )
+
+    def _read(self) -> dict[str, list[float]]:
+        samples: dict[str, list[float]] = {}
+        with self._connect() as conn:
+            for key, seconds in conn.execute("SELECT key, seconds FROM samples ORDER BY id"):
+                samples.setdefault(key, []).append(seconds)
+        return {k: v[-MAX_SAMPLES_PER_KEY:] for k, v in samples.items()}
+
+    def samples(self, key: str) -> list[float]:
+        return list(self._samples.get(key, []))
+
+    def expected_seconds(self, key: str) -> float:
+        """Median completion time for `key`, or the default prior if unknown."""
+        samples = self._samples.get(key)
+        if not samples:
+            return DEFAULT_EXPECTED_SECONDS
+        return statistics.median(samples)
+
+    def percentile(self, key: str, q: float) -> float | None:
+        """The q-th percentile (0–100) of recorded completion times, or None without history."""
+        samples = sorted(self._samples.get(key, []))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def record(self, key: str, seconds: float) -> None:
+        """Add a completion time and refresh `key` with the samples other processes have recorded."""
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT INTO samples (key, seconds) VALUES (?, ?)", (key, seconds))
+            conn.execute(
+                "DELETE FROM samples WHERE key = ? AND id NOT IN"
+                " (SELECT id FROM samples WHERE key = ? ORDER BY id DESC LIMIT ?)",
+                (key, key, MAX_SAMPLES_PER_KEY),
+            )
+            rows = conn.execute("SELECT seconds FROM samples WHERE key = ? ORDER BY id", (key,)).fetchall()
+            self._samples[key] = [row[0] for row in rows]
+
+
+def next_poll_delay(elapsed: float, expected: float) -> float:
+    """Seconds until the next poll of an operation that has run for `elapsed` seconds.
+
+    Before the expected finish the delay halves the remaining gap, so polls
+    are sparse early and converge on the expected time. After it, polls stay
+    dense and back off slowly in case the operation is running long.
+    """
+    remaining = expected - elapsed
+    if remaining > 0:
+        delay = remaining / 2
+    else:
+        delay = MIN_POLL_SECONDS + (-remaining) * 0.25
+    delay = min(MAX_POLL_SECONDS, max(MIN_POLL_SECONDS, delay))
+    return delay * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
@@ -0,0 +1,188 @@
+"""Minimal in-process MP4 (ISO BMFF) box reader.
+
+Reads just enough of the container structure to answer questions about a
+clip — its duration, frame size and tracks — without spawning ffprobe. Works
+on a path or on bytes already in memory, and only reads box headers plus the
+few small boxes it needs, so it is cheap even on large files.
+
+`validate_clip` uses this to reject truncated or malformed downloads (a box
+that runs past the end of the file, a missing moov or empty mdat) and clips
+that don't match what was requested, before they reach the assembler.
+"""
+
+import io
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+DURATION_TOLERANCE_SECONDS = 0.5
+ASPECT_TOLERANCE = 0.02
+RESOLUTION_LINES = {"720p": 720, "1080p": 1080, "4k": 2160}
+
+
+class MP4Error(ValueError):
+    """The data is not a readable MP4 container."""
+
+
+def _open(source: str | Path | bytes | BinaryIO) -> tuple[BinaryIO, int]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        f = io.BytesIO(source)
+    elif isinstance(source, (str, Path)):
+        f = open(source, "rb")
+    else:
+        f = source
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return f, size
+
+
+def iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Yield (type, payload_offset, payload_size) for each box in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            raise MP4Error(f"truncated box header at offset {pos}")
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                raise MP4Error(f"truncated 64-bit box size at offset {pos}")
+            size = struct.unpack(">Q", large)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise MP4Error(f"box '{box_type.decode('latin-1')}' at offset {pos} overruns its parent")
+        yield box_type, pos + header_size, size - header_size
+        pos += size
+
+
+def find_box(f: BinaryIO, start: int, end: int, path: list[bytes]) -> tuple[int, int] | None:
+    """Follow a path of box types (e.g. [b"moov", b"mvhd"]). Returns (offset, size) or None."""
+    for box_type, offset, size in iter_boxes(f, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return offset, size
+            return find_box(f, offset, offset + size, path[1:])
+    return None
+
+
+def _read_mvhd(f: BinaryIO, offset: int) -> tuple[int, int]:
+    """Return (timescale, duration) from an mvhd/mdhd payload."""
+    f.seek(offset)
+    version = f.read(1)[0]
+    f.seek(offset + 4)
+    if version == 1:
+        _, _, timescale, duration = struct.unpack(">QQIQ", f.read(28))
+    else:
+        _, _, timescale, duration = struct.unpack(">IIII", f.read(16))
+    return timescale, duration
+
+
+@dataclass(frozen=True)
+class ClipInfo:
+    duration: float
+    width: int
+    height: int
+    has_video: bool
+    has_audio: bool
+
+
+def _read_tkhd_size(f: BinaryIO, offset: int) -> tuple[int, int]:
+    """(width, height) in pixels from a tkhd payload (16.16 fixed point)."""
+    f.seek(offset)
+    version = f.read(1)[0]
+    f.seek(offset + (88 if version == 1 else 76))
+    width, height = struct.unpack(">II", f.read(8))
+    return width >> 16, height >> 16
+
+
+def _read_handler(f: BinaryIO, offset: int) -> bytes:
+    """Handler type (b"vide", b"soun", ...) from an hdlr payload."""
+    f.seek(offset + 8)
+    return f.read(4)
+
+
+def probe(source: str | Path | bytes | BinaryIO) -> ClipInfo:
+    """Walk the whole box structure and summarize the clip. Raises MP4Error if it is malformed."""
+    f, size = _open(source)
+    try:
+        top = {box_type: (offset, box_size) for box_type, offset, box_size in iter_boxes(f, 0, size)}
+        if b"moov" not in top:
+            raise MP4Error("no moov box")
+        if top.get(b"mdat", (0, 0))[1] == 0:
+            raise MP4Error("no media data (missing or empty mdat)")
+
+        moov_offset, moov_size = top[b"moov"]
+        mvhd = find_box(f, moov_offset, moov_offset + moov_size, [b"mvhd"])
+        if mvhd is None:
+            raise MP4Error("no moov/mvhd box")
+        timescale, duration = _read_mvhd(f, mvhd[0])
+        if timescale == 0:
+            raise MP4Error("mvhd timescale is zero")
+
+        width = height = 0
+        has_video = has_audio = False
+        for box_type, offset, box_size in iter_boxes(f, moov_offset, moov_offset + moov_size):
+            if box_type != b"trak":
+                continue
+            hdlr = find_box(f, offset, offset + box_size, [b"mdia", b"hdlr"])
+            handler = _read_handler(f, hdlr[0]) if hdlr else b""
+            if handler == b"vide" and not has_video:
+                has_video = True
+                tkhd = find_box(f, offset, offset + box_size, [b"tkhd"])
+                if tkhd is not None:
+                    width, height = _read_tkhd_size(f, tkhd[0])
+            elif handler == b"soun":
+                has_audio = True
+
+        return ClipInfo(duration / timescale, width, height, has_video, has_audio)
+    finally:
+        if not isinstance(source, io.IOBase):
+            f.close()
+
+
+def validate_clip(
+    source: str | Path | bytes | BinaryIO,
+    duration: float | None = None,
+    aspect_ratio: str | None = None,
+    resolution: str | None = None,
+    require_audio: bool = True,
+) -> ClipInfo:
+    """Check a generated clip's structure and that it matches the request. Raises MP4Error if not."""
+    info = probe(source)
+    if not info.has_video:
+        raise MP4Error("no video track")
+    if require_audio and not info.has_audio:
+        raise MP4Error("no audio track")
+    if duration is not None and abs(info.duration - duration) > DURATION_TOLERANCE_SECONDS:
+        raise MP4Error(f"duration {info.duration:.2f}s, expected {duration}s")
+    if aspect_ratio is not None and info.height:
+        w, h = (int(x) for x in aspect_ratio.split(":"))
+        actual = info.width / info.height
+        if abs(actual - w / h) > ASPECT_TOLERANCE * (w / h):
+            raise MP4Error(f"frame size {info.width}x{info.height} is not {aspect_ratio}")
+    if resolution in RESOLUTION_LINES and min(info.width, info.height) != RESOLUTION_LINES[resolution]:
+        raise MP4Error(f"frame size {info.width}x{info.height} is not {resolution}")
+    return info
+
+
+def read_duration(source: str | Path | bytes | BinaryIO) -> float:
+    """Duration in seconds from the movie header (moov/mvhd)."""
+    f, size = _open(source)
+    try:
+        mvhd = find_box(f, 0, size, [b"moov", b"mvhd"])
+        if mvhd is None:
+            raise MP4Error("no moov/mvhd box")
+        timescale, duration = _read_mvhd(f, mvhd[0])
+        if timescale == 0:
+            raise MP4Error("mvhd timescale is zero")
+        return duration / timescale
+    finally:
+        if not isinstance(source, io.IOBase):
+            f.close()
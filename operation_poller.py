@@ -0,0 +1,229 @@
+"""Poll every in-flight Veo operation from a single asyncio event loop.
+
+Instead of one blocking `while not operation.done: time.sleep(...)` loop per
+shot, callers hand their operation to a shared `OperationPoller` and await the
+result. The poller keeps all pending operations in one table, refreshes the
+ones that are due in batches through the google-genai async client
+(`client.aio.operations.get`), and resolves one future per operation.
+
+When an operation is registered with a latency key, its poll schedule comes
+from the learned completion-time model in `latency_model` and the observed
+completion time is fed back into it.
+
+An operation can also be given a deadline (see `deadline_for`). If it is
+still running when the deadline passes, or its progress metadata stops
+moving for STALL_SECONDS, the wait fails with `retry_policy.OperationTimeout`
+so the caller's retry policy resubmits it, and the event is kept in
+`OperationPoller.expired` for the run report.
+
+A failed poll says nothing about the operation itself, which may still be
+running on the server. Failed polls are retried with capped exponential
+backoff until the deadline. An operation without a deadline gives up after
+MAX_POLL_ERRORS consecutive failures with `PollUnavailable`. That leaves the
+operation resumable, so the caller can re-attach to it rather than pay for a
+new one.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from latency_model import LatencyModel, next_poll_delay
+from retry_policy import OperationTimeout
+
+POLL_INTERVAL_SECONDS = 15  # fixed schedule for operations without a latency key
+POLL_BATCH_SIZE = 16  # concurrent operations.get calls per tick
+MAX_POLL_ERRORS = 5  # consecutive failed polls before giving up on an operation without a deadline
+POLL_ERROR_BACKOFF_MAX_SECONDS = 120
+STALL_SECONDS = 180  # unchanged progress metadata for this long means the operation is stuck
+
+# Model prefix -> (base seconds, extra seconds per second of video); longest prefix wins
+DEADLINES = {
+    "veo-3.1-fast": (300, 15),
+    "veo-3.1": (480, 30),
+}
+DEFAULT_DEADLINE = (600, 30)
+PROGRESS_FIELDS = ("progressPercent", "progress_percent", "progress")
+
+
+class PollUnavailable(RuntimeError):
+    """The operation's status couldn't be fetched; it may still be running and can be re-attached to."""
+
+
+def deadline_for(model: str, duration: int | None = None) -> float:
+    """Seconds an operation for `model` producing `duration` seconds of video may run."""
+    prefix = max((p for p in DEADLINES if model.startswith(p)), key=len, default=None)
+    base, per_second = DEADLINES[prefix] if prefix else DEFAULT_DEADLINE
+    return base + per_second * (duration or 8)
+
+
+def _progress(operation) -> float | None:
+    metadata = getattr(operation, "metadata", None)
+    if not isinstance(metadata, dict):
+        return None
+    for name in PROGRESS_FIELDS:
+        if isinstance(metadata.get(name), (int, float)):
+            return float(metadata[name])
+    return None
+
+
+@dataclass
+class _Pending:
+    client: object
+    operation: object
+    future: asyncio.Future
+    next_poll: float
+    key: str | None = None
+    expected: float | None = None
+    errors: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+    deadline_at: float | None = None
+    progress: float | None = None
+    progress_at: float = field(default_factory=time.monotonic)
+
+
+class OperationPoller:
+    """Own all pending operations for one event loop and resolve them as they finish."""
+
+    def __init__(
+        self,
+        interval: float = POLL_INTERVAL_SECONDS,
+        batch_size: int = POLL_BATCH_SIZE,
+        latency: LatencyModel | None = None,
+    ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.latency = latency
+        self.polls = 0
+        self.expired: list[dict] = []  # operations abandoned for missing their deadline or stalling
+        self._pending: dict[int, _Pending] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def wait(self, client, operation, key: str | None = None, deadline: float | None = None,
+                   submitted_at: float | None = None):
+        """Wait until `operation` (created by `client`) is done and return its final state.
+
+        `submitted_at` is when the operation was submitted (a time.time()
+        value, e.g. from the journal for a re-attached operation); it defaults
+        to now. `key` (see `latency_model.key_for`) enables adaptive polling
+        and records the completion time since submission under that key. With
+        `deadline` (seconds after submission), raise OperationTimeout if the
+        operation is still running by then or stops making progress.
+        """
+        if operation.done:
+            return operation
+
+        loop = asyncio.get_running_loop()
+        entry = _Pending(
+            client=client,
+            operation=operation,
+            future=loop.create_future(),
+            next_poll=0.0,
+            key=key,
+        )
+        if submitted_at is not None:
+            # Poller clocks are monotonic; carry over the time already spent since submission
+            entry.submitted_at -= max(0.0, time.time() - submitted_at)
+        if deadline is not None:
+            entry.deadline_at = entry.submitted_at + deadline
+        if key is not None and self.latency is not None:
+            entry.expected = self.latency.expected_seconds(key)
+        entry.next_poll = self._next_poll(entry)
+        slot = id(entry)
+        self._pending[slot] = entry
+        self._ensure_running()
+        try:
+            return await entry.future
+        finally:
+            self._pending.pop(slot, None)
+
+    def _next_poll(self, entry: _Pending) -> float:
+        now = time.monotonic()
+        if entry.expected is None:
+            return now + self.interval
+        return now + next_poll_delay(now - entry.submitted_at, entry.expected)
+
+    def _ensure_running(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            now = time.monotonic()
+            for entry in list(self._pending.values()):
+                if entry.deadline_at is not None and now >= entry.deadline_at:
+                    self._expire(entry, f"still running after its {entry.deadline_at - entry.submitted_at:.0f}s deadline")
+            due = [e for e in self._pending.values()
+                   if e.next_poll <= now and not e.future.done()]
+
+            for start in range(0, len(due), self.batch_size):
+                batch = due[start:start + self.batch_size]
+                results = await asyncio.gather(
+                    *(e.client.aio.operations.get(e.operation) for e in batch),
+                    return_exceptions=True,
+                )
+                self.polls += len(batch)
+                for entry, result in zip(batch, results):
+                    self._handle_poll_result(entry, result)
+
+            waiting = [e for e in self._pending.values() if not e.future.done()]
+            if not waiting:
+                break
+            next_due = min(min(e.next_poll, e.deadline_at or e.next_poll) for e in waiting)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_due - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    def _handle_poll_result(self, entry: _Pending, result) -> None:
+        if entry.future.done():
+            return
+        if isinstance(result, BaseException):
+            entry.errors += 1
+            if entry.deadline_at is None and entry.errors >= MAX_POLL_ERRORS:
+                name = getattr(entry.operation, "name", None)
+                error = PollUnavailable(f"Operation {name}: {entry.errors} polls in a row failed — {result}")
+                error.__cause__ = result
+                entry.future.set_exception(error)
+            else:
+                backoff = min(POLL_ERROR_BACKOFF_MAX_SECONDS, self.interval * 2 ** (entry.errors - 1))
+                entry.next_poll = time.monotonic() + backoff
+            return
+
+        entry.errors = 0
+        entry.operation = result
+        if result.done:
+            if entry.key is not None and self.latency is not None and getattr(result, "error", None) is None:
+                self.latency.record(entry.key, time.monotonic() - entry.submitted_at)
+            entry.future.set_result(result)
+            return
+
+        now = time.monotonic()
+        progress = _progress(result)
+        if progress is not None and progress != entry.progress:
+            entry.progress, entry.progress_at = progress, now
+        elif progress is not None and now - entry.progress_at >= STALL_SECONDS:
+            self._expire(entry, f"progress stuck at {progress:g}% for {now - entry.progress_at:.0f}s")
+            return
+        entry.next_poll = self._next_poll(entry)
+
+    def _expire(self, entry: _Pending, reason: str) -> None:
+        if entry.future.done():
+            return
+        name = getattr(entry.operation, "name", None)
+        self.expired.append({
+            "operation": name,
+            "key": entry.key,
+            "reason": reason,
+            "elapsed_seconds": round(time.monotonic() - entry.submitted_at, 1),
+        })
+        entry.future.set_exception(OperationTimeout(f"Operation {name} abandoned: {reason}"))
@@ -2,6 +2,8 @@ import yaml
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader
 
+import shot_scheduler
+
 # Set up Jinja2 environment
 TEMPLATE_DIR = Path(__file__).parent / "prompts"
 env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), trim_blocks=True, lstrip_blocks=True)
@@ -30,8 +32,9 @@ def build_video_continuation_prompt(channel: dict, description: str) -> str:
     template = env.get_template("video_continuation_prompt.jinja")
     return template.render(channel=channel, description=description)
 
-def build_story_user_prompt(channel: dict, aspect_ratio: str, shot_dur: int, total_dur: int, idea_line: str, num_shots: int) -> str:
-    """Renders the user prompt for story generation."""
+def build_story_user_prompt(channel: dict, aspect_ratio: str, shot_dur: int, total_dur: int, idea_line: str, num_shots: int,
+                            max_chain: int = shot_scheduler.MAX_CHAIN_LENGTH) -> str:
+    """Renders the user prompt for story generation. `max_chain` caps a T2V shot plus its I2V continuations."""
     template = env.get_template("story_user_prompt.jinja")
     # We can generate a generic pool of up to 5 dynamic items per story.
     dynamic_slots = 5
@@ -42,7 +45,8 @@ def build_story_user_prompt(channel: dict, aspect_ratio: str, shot_dur: int, tot
         total_dur=total_dur,
         idea_line=idea_line,
         dynamic_slots=dynamic_slots,
-        num_shots=num_shots
+        num_shots=num_shots,
+        max_i2v_run=max_chain - 1,
     )
 
 def build_ref_image_prompt(channel: dict, object_description: str, ref_type: str = "prop") -> str:
@@ -0,0 +1,158 @@
+"""Cross-process token-bucket rate limiter for GenAI requests.
+
+Every entry point (video_generator, subscribe, thumbnail, ref_image_generator,
+story_generator and the bin/ scripts) draws from the same per-model buckets.
+Bucket state lives in a small SQLite database, so separate processes running
+at the same time share one budget instead of each hitting the quota blindly.
+
+Acquiring a token reserves it immediately and returns how long the caller has
+to wait for it, so concurrent callers are admitted one after another at
+exactly the bucket's sustainable rate. A 429 (`penalize`) puts the bucket
+into debt for later reservations and also records a penalty window. Callers
+that were already waiting check that window before they return, so a 429
+holds back requests that were reserved before it too.
+
+With several credentials (see `clients.ClientPool`), each one has its own
+quota, so every call takes an optional `credential` that gives it a separate
+bucket with the same limits.
+"""
+
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+
+RATE_LIMIT_DB = Path("output") / ".state" / "ratelimit.sqlite3"
+
+# bucket name -> (requests per minute, burst). Tune to the project's quota.
+RATE_LIMITS = {
+    "veo-3.1-fast": (4.0, 2),
+    "veo-3.1": (2.0, 1),
+    "gemini-3-pro-image": (10.0, 2),
+    "gemini-3.1-pro": (20.0, 4),
+}
+
+
+def bucket_for(model: str) -> str | None:
+    """Map a full model name (e.g. "veo-3.1-fast-generate-preview") to its bucket, if any."""
+    matches = [name for name in RATE_LIMITS if model.startswith(name)]
+    return max(matches, key=len) if matches else None
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS buckets ("
+        " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS penalties (name TEXT PRIMARY KEY, until REAL NOT NULL)")
+    return conn
+
+
+def _row_name(bucket: str, credential: str | None) -> str:
+    return bucket if credential is None else f"{bucket}@{credential}"
+
+
+def _take(bucket: str, cost: float, db_path: Path, drain: bool = False, credential: str | None = None) -> float:
+    """Reserve `cost` tokens from `bucket`. Returns the seconds to wait before using them.
+
+    With `drain`, any banked burst is discarded first so the debt is exact.
+    """
+    per_minute, burst = RATE_LIMITS[bucket]
+    rate = per_minute / 60.0
+    name = _row_name(bucket, credential)
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        tokens = float(burst) if row is None else min(float(burst), row[0] + (now - row[1]) * rate)
+        if drain:
+            tokens = min(tokens, 0.0)
+        tokens -= cost
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+            (name, tokens, now),
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return 0.0 if tokens >= 0 else -tokens / rate
+
+
+def _penalty_remaining(bucket: str, db_path: Path, credential: str | None = None) -> float:
+    """Seconds left in the bucket's current 429 penalty window."""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT until FROM penalties WHERE name = ?", (_row_name(bucket, credential),)
+        ).fetchone()
+    finally:
+        conn.close()
+    return 0.0 if row is None else max(0.0, row[0] - time.time())
+
+
+def wait_seconds(model: str, credential: str | None = None, db_path: Path = RATE_LIMIT_DB) -> float:
+    """Seconds until a request to `model` would be admitted, without reserving anything."""
+    bucket = bucket_for(model)
+    if bucket is None:
+        return 0.0
+    per_minute, burst = RATE_LIMITS[bucket]
+    rate = per_minute / 60.0
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT tokens, updated FROM buckets WHERE name = ?", (_row_name(bucket, credential),)
+        ).fetchone()
+    finally:
+        conn.close()
+    tokens = float(burst) if row is None else min(float(burst), row[0] + (time.time() - row[1]) * rate)
+    return max(0.0, (1.0 - tokens) / rate)
+
+
+def acquire(model: str, db_path: Path = RATE_LIMIT_DB, credential: str | None = None) -> float:
+    """Block until a request to `model` is admitted. Returns the seconds waited."""
+    bucket = bucket_for(model)
+    if bucket is None:
+        return 0.0
+    wait = _take(bucket, 1.0, db_path, credential=credential)
+    waited = 0.0
+    while wait > 0:
+        time.sleep(wait)
+        waited += wait
+        # A 429 seen while this caller slept holds it back too
+        wait = _penalty_remaining(bucket, db_path, credential)
+    return waited
+
+
+async def acquire_async(model: str, db_path: Path = RATE_LIMIT_DB, credential: str | None = None) -> float:
+    """Async variant of `acquire` for code running on the event loop."""
+    bucket = bucket_for(model)
+    if bucket is None:
+        return 0.0
+    wait = await asyncio.to_thread(_take, bucket, 1.0, db_path, False, credential)
+    waited = 0.0
+    while wait > 0:
+        await asyncio.sleep(wait)
+        waited += wait
+        wait = await asyncio.to_thread(_penalty_remaining, bucket, db_path, credential)
+    return waited
+
+
+def penalize(model: str, seconds: float, db_path: Path = RATE_LIMIT_DB, credential: str | None = None) -> None:
+    """Push a bucket `seconds` into debt after a 429 so every process backs off together."""
+    bucket = bucket_for(model)
+    if bucket is None:
+        return
+    per_minute, _ = RATE_LIMITS[bucket]
+    _take(bucket, seconds * per_minute / 60.0, db_path, drain=True, credential=credential)
+    conn = _connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO penalties (name, until) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET until = MAX(until, excluded.until)",
+            (_row_name(bucket, credential), time.time() + seconds),
+        )
+    finally:
+        conn.close()
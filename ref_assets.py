@@ -0,0 +1,77 @@
+"""Upload-ready reference images, prepared once and reused.
+
+Character and prop refs are sent with every T2V shot of every story and with
+every thumbnail request. Instead of re-reading, re-decoding and re-encoding
+each PNG per request, `load_ref` normalizes an image once — RGB on white,
+longest side capped at REF_MAX_SIDE, re-encoded as JPEG — stores the result
+under output/.cache/refs/, and keeps the bytes and their base64 form in
+memory for the rest of the run.
+"""
+
+import base64
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+from PIL import Image
+
+REF_CACHE_DIR = Path("output") / ".cache" / "refs"
+REF_MAX_SIDE = 1024  # the image models downscale anything larger before use
+REF_JPEG_QUALITY = 92
+
+_loaded: dict[tuple[str, int, int], "RefImage"] = {}
+
+
+@dataclass(frozen=True)
+class RefImage:
+    source: Path
+    data: bytes
+    mime_type: str = "image/jpeg"
+
+    @cached_property
+    def b64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+
+def _normalize(raw: bytes) -> bytes:
+    img = Image.open(io.BytesIO(raw))
+    img.load()
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    else:
+        img = img.convert("RGB")
+    img.thumbnail((REF_MAX_SIDE, REF_MAX_SIDE), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=REF_JPEG_QUALITY)
+    return out.getvalue()
+
+
+def load_ref(path: str | Path) -> RefImage:
+    """Return the normalized, upload-ready form of the image at `path`."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    if memo_key in _loaded:
+        return _loaded[memo_key]
+
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw + f"|{REF_MAX_SIDE}|{REF_JPEG_QUALITY}".encode()).hexdigest()
+    cached = REF_CACHE_DIR / f"{digest}.jpg"
+    if cached.exists():
+        data = cached.read_bytes()
+    else:
+        data = _normalize(raw)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f".{cached.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, cached)
+
+    ref = RefImage(source=path, data=data)
+    _loaded[memo_key] = ref
+    return ref
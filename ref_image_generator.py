@@ -7,7 +7,10 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+import clients
+import content_cache
 import prompt_builder
+import rate_limiter
 
 load_dotenv()
 
@@ -22,10 +25,20 @@ def generate_reference_image(
     output_path: Path,
     aspect_ratio: str = "1:1",
 ) -> None:
-    """Generates an image using Gemini and saves it to output_path."""
+    """Generates an image using Gemini and saves it to output_path.
+
+    An identical earlier request (same model, prompt and aspect ratio) is
+    served from the content cache instead.
+    """
+    key = content_cache.content_key(MODEL, prompt, aspect_ratio=aspect_ratio)
+    if content_cache.fetch(key, output_path):
+        print(f"Served {output_path} from cache")
+        return
+
     print(f"Generating image for prompt: '{prompt}'")
 
     # Generate the image
+    rate_limiter.acquire(MODEL)
     result = client.models.generate_content(
         model=MODEL,
         contents=[prompt],
@@ -44,6 +57,7 @@ def generate_reference_image(
         img = part.as_image()
         if img:
             img.save(str(output_path))
+            content_cache.store(key, output_path)
             print(f"Saved image to {output_path}")
             return
 
@@ -80,7 +94,7 @@ def run_story_mode(story_path: Path, channel_override: str | None) -> None:
     out_dir = Path("assets") / "ref" / video_id / story_name
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    client = genai.Client()
+    client = clients.make_client()
 
     print(f"Found {len(new_refs)} new reference images to generate for '{video_id}/{story_name}'.")
     for ref in new_refs:
@@ -89,14 +103,17 @@ def run_story_mode(story_path: Path, channel_override: str | None) -> None:
         description = ref["description"]
         out_path = out_dir / f"{ref_id}.png"
 
-        if out_path.exists():
-            print(f"Skipping '{ref_id}' - image already exists at {out_path}")
-            continue
-
         full_prompt = prompt_builder.build_ref_image_prompt(channel_config, description, ref_type)
         # Props are always square; scenery matches the video aspect ratio for better composition framing
         img_aspect_ratio = video_aspect_ratio if ref_type == "scenery" else "1:1"
 
+        if out_path.exists():
+            if content_cache.is_current(out_path, content_cache.content_key(MODEL, full_prompt, aspect_ratio=img_aspect_ratio)):
+                print(f"Skipping '{ref_id}' - image already exists at {out_path}")
+                continue
+            print(f"Regenerating '{ref_id}' - its description changed since {out_path} was generated")
+            out_path.unlink()
+
         try:
             generate_reference_image(client, full_prompt, out_path, img_aspect_ratio)
         except Exception as e:
@@ -121,7 +138,7 @@ def run_channel_mode(channel_name: str) -> None:
     out_dir = Path("assets") / "ref" / "channels" / channel_name
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    client = genai.Client()
+    client = clients.make_client()
 
     print(f"Found {len(characters)} character(s) to generate for channel '{channel_name}'.")
     for char in characters:
@@ -132,14 +149,18 @@ def run_channel_mode(channel_name: str) -> None:
             continue
 
         out_path = out_dir / f"{char_id}.png"
-        if out_path.exists():
-            print(f"Skipping '{char_id}' - image already exists at {out_path}")
-            continue
 
         # Characters are always isolated on a plain white background
         description_with_bg = f"{visual_description}, isolated entirely on a plain white background."
         full_prompt = prompt_builder.build_ref_image_prompt(channel_config, description_with_bg)
 
+        if out_path.exists():
+            if content_cache.is_current(out_path, content_cache.content_key(MODEL, full_prompt, aspect_ratio="1:1")):
+                print(f"Skipping '{char_id}' - image already exists at {out_path}")
+                continue
+            print(f"Regenerating '{char_id}' - its description changed since {out_path} was generated")
+            out_path.unlink()
+
         try:
             generate_reference_image(client, full_prompt, out_path)
         except Exception as e:
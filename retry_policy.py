@@ -0,0 +1,206 @@
+"""Classify GenAI failures and decide whether, and when, to retry them.
+
+Every failure is put into one of four classes, each with its own retry budget
+and jittered exponential backoff:
+
+  quota      429 / RESOURCE_EXHAUSTED — wait for the bucket to refill
+  transient  5xx, timeouts, stuck operations, dropped connections,
+             truncated or corrupt clips (resubmitted at once: the operation
+             has already finished, so there is no service to wait out)
+  safety     the prompt or the output was blocked — resubmitting won't help
+  invalid    400-class request errors — resubmitting won't help either
+
+A per-model circuit breaker counts consecutive transient failures. Once a
+model looks hard-down, every caller that checks the circuit pauses together
+until the cooldown passes, instead of each burning its retries against it.
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from google.genai import errors
+
+import mp4
+
+QUOTA = "quota"
+TRANSIENT = "transient"
+SAFETY = "safety"
+INVALID = "invalid"
+
+
+@dataclass(frozen=True)
+class Policy:
+    max_attempts: int  # failures of this class tolerated per request, including the first
+    base_seconds: float
+    max_seconds: float
+
+
+POLICIES = {
+    QUOTA: Policy(max_attempts=6, base_seconds=30, max_seconds=600),
+    TRANSIENT: Policy(max_attempts=4, base_seconds=10, max_seconds=120),
+    SAFETY: Policy(max_attempts=1, base_seconds=0, max_seconds=0),
+    INVALID: Policy(max_attempts=1, base_seconds=0, max_seconds=0),
+}
+
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive transient failures before a model is considered down
+CIRCUIT_COOLDOWN_SECONDS = 300
+
+SAFETY_MARKERS = ("safety", "usage guidelines", "responsible ai", "prohibited")
+TRANSIENT_HTTP_CODES = {408, 500, 502, 503, 504}
+# google.rpc.Code values reported in a failed operation's `error`
+RPC_RESOURCE_EXHAUSTED = 8
+RPC_INVALID_CODES = {3, 5, 7, 9, 11, 12, 16}  # invalid argument, not found, permission, precondition, range, unimplemented, auth
+
+
+class OperationFailed(RuntimeError):
+    """A long-running operation finished without a usable video."""
+
+    def __init__(self, message: str, code: int | None = None) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class SafetyBlocked(OperationFailed):
+    """The request or its output was blocked by safety filters."""
+
+
+class OperationTimeout(OperationFailed):
+    """An operation missed its deadline or stopped making progress; resubmitting is worth it."""
+
+
+def _looks_like_safety(message: str) -> bool:
+    message = message.lower()
+    return any(marker in message for marker in SAFETY_MARKERS)
+
+
+def _with_prefix(prefix: str, message: str) -> str:
+    """`prefix: message`, unless the service's message already says it is about video generation."""
+    return message if message.lower().startswith("video generation") else f"{prefix}: {message}"
+
+
+def generated_video(operation):
+    """Return the first generated video of a finished operation, or raise a typed error."""
+    error = getattr(operation, "error", None)
+    if error:
+        message = str(error.get("message", error)) if isinstance(error, dict) else str(error)
+        code = error.get("code") if isinstance(error, dict) else None
+        if _looks_like_safety(message):
+            raise SafetyBlocked(_with_prefix("Video generation blocked", message), code)
+        raise OperationFailed(_with_prefix("Video generation failed", message), code)
+
+    response = operation.response
+    if response is None:
+        raise OperationFailed(f"Video generation failed (no response): {operation}")
+    if not response.generated_videos:
+        if response.rai_media_filtered_count:
+            reasons = "; ".join(response.rai_media_filtered_reasons or []) or "no reason given"
+            raise SafetyBlocked(f"Video generation blocked by safety filters: {reasons}")
+        raise OperationFailed(f"Video generation failed (no videos returned): {operation}")
+    return response.generated_videos[0].video
+
+
+def classify(exc: BaseException) -> str:
+    """Map an exception from a generation attempt to QUOTA, TRANSIENT, SAFETY or INVALID."""
+    if isinstance(exc, SafetyBlocked):
+        return SAFETY
+    if isinstance(exc, errors.APIError):
+        if exc.code == 429 or exc.status == "RESOURCE_EXHAUSTED":
+            return QUOTA
+        if exc.code in TRANSIENT_HTTP_CODES or exc.code >= 500:
+            return TRANSIENT
+        if _looks_like_safety(exc.message or ""):
+            return SAFETY
+        return INVALID
+    if isinstance(exc, OperationFailed):
+        if exc.code == RPC_RESOURCE_EXHAUSTED:
+            return QUOTA
+        if exc.code in RPC_INVALID_CODES:
+            return INVALID
+        return TRANSIENT
+    # Timeouts, dropped connections, truncated downloads, corrupt clips, and anything unforeseen
+    return TRANSIENT
+
+
+def backoff(error_class: str, attempt: int) -> float:
+    """Full-jitter exponential backoff for the `attempt`-th failure of a class."""
+    policy = POLICIES[error_class]
+    ceiling = min(policy.max_seconds, policy.base_seconds * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+class Retry:
+    """Retry bookkeeping for one request: per-class failure counts against their budgets."""
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.failures: Counter = Counter()
+        self.last_class: str | None = None
+
+    @property
+    def attempts(self) -> int:
+        """Failed attempts so far."""
+        return sum(self.failures.values())
+
+    def next_delay(self, exc: BaseException) -> float | None:
+        """Record a failure. Returns seconds to wait before retrying, or None to give up."""
+        error_class = classify(exc)
+        self.last_class = error_class
+        self.failures[error_class] += 1
+        record_failure(self.model, error_class)
+        if self.failures[error_class] >= POLICIES[error_class].max_attempts:
+            return None
+        if isinstance(exc, mp4.MP4Error):
+            return 0.0  # an invalid clip counts against the budget but is resubmitted immediately
+        return backoff(error_class, self.failures[error_class])
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    open_until: float = 0.0
+
+
+_circuits: dict[str, _Circuit] = {}
+
+
+def record_success(model: str) -> None:
+    _circuits.pop(model, None)
+
+
+def record_failure(model: str, error_class: str) -> None:
+    """Count a consecutive transient failure; open the circuit at the threshold.
+
+    The count is not reset when the cooldown ends, so the first request after
+    it acts as a probe: another failure re-opens the circuit straight away.
+    """
+    if error_class != TRANSIENT:
+        return
+    circuit = _circuits.setdefault(model, _Circuit())
+    circuit.failures += 1
+    if circuit.failures >= CIRCUIT_FAILURE_THRESHOLD and circuit.open_until <= time.monotonic():
+        circuit.open_until = time.monotonic() + CIRCUIT_COOLDOWN_SECONDS
+        print(f"  {model}: {circuit.failures} consecutive failures — pausing requests for {CIRCUIT_COOLDOWN_SECONDS}s")
+
+
+def circuit_delay(model: str) -> float:
+    circuit = _circuits.get(model)
+    return max(0.0, circuit.open_until - time.monotonic()) if circuit else 0.0
+
+
+def wait_for_circuit(model: str) -> None:
+    """Block while the model's circuit is open."""
+    while (delay := circuit_delay(model)) > 0:
+        time.sleep(delay)
+
+
+async def wait_for_circuit_async(model: str) -> None:
+    """Async variant of `wait_for_circuit`; pauses every scheduled shot together."""
+    while (delay := circuit_delay(model)) > 0:
+        await asyncio.sleep(delay)
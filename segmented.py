@@ -0,0 +1,109 @@
+"""Encode a timeline as independent segments in parallel.
+
+MoviePy renders a timeline through one Python frame loop feeding one libx264
+process, which leaves most cores idle on a long render. Here the timeline is
+split at shot boundaries into `Segment`s, and each segment is rendered by
+its own worker process with identical encoder settings. Every segment
+starts a new closed GOP and the segments share their parameter sets, so
+ffmpeg's concat demuxer joins them by stream copy. The audio track is built
+separately for the whole timeline (see `audio_mix`) and muxed in alongside.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import smartcut
+from encoding_profiles import EncodingProfile
+
+PIXEL_FORMAT = "yuv420p"
+ENCODER_PARAMS = ["-profile:v", "high", "-x264-params", "open-gop=0"]  # same for every segment, so they join cleanly
+
+
+@dataclass(frozen=True)
+class Segment:
+    """One stretch of the timeline: part of a clip, or a black card when `path` is None."""
+
+    path: str | None
+    start: float = 0.0
+    end: float | None = None  # None runs to the end of the clip
+    fade_out: float = 0.0  # seconds of fade to black at the end of the segment
+    duration: float = 0.0  # black cards only
+    size: tuple[int, int] | None = None  # black cards only
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def _render(segment: Segment, out: str, fps: float, profile: EncodingProfile, threads: int) -> None:
+    """Encode one segment to `out`. Runs in a worker process."""
+    from moviepy import ColorClip, VideoFileClip
+    from moviepy.video.fx import FadeOut
+
+    source = None
+    if segment.path is None:
+        clip = ColorClip(size=segment.size, color=(0, 0, 0), duration=segment.duration).with_fps(fps)
+    else:
+        source = VideoFileClip(segment.path, audio=False)
+        end = source.duration if segment.end is None else min(segment.end, source.duration)
+        clip = source.subclipped(segment.start, end)
+    if segment.fade_out:
+        clip = clip.with_effects([FadeOut(duration=segment.fade_out)])
+
+    clip.write_videofile(
+        out,
+        fps=fps,
+        codec="libx264",
+        audio=False,
+        preset=profile.preset,
+        threads=threads,
+        ffmpeg_params=ENCODER_PARAMS + profile.video_args(fps),
+        pixel_format=PIXEL_FORMAT,
+        logger=None,
+    )
+    clip.close()
+    if source is not None:
+        source.close()
+
+
+def render(
+    segments: list[Segment],
+    audio_path: Path | None,
+    output_path: Path,
+    fps: float,
+    profile: EncodingProfile,
+    workers: int | None = None,
+) -> None:
+    """Encode `segments` with `profile` in a pool of `workers` processes and join them, with the AAC track in `audio_path`."""
+    workers = max(1, min(workers or default_workers(), len(segments)))
+    threads = max(1, default_workers() // workers)
+    started = time.monotonic()
+
+    with tempfile.TemporaryDirectory(prefix="segments-", dir=output_path.parent) as tmp:
+        tmp = Path(tmp)
+        pieces = [tmp / f"{i:03d}.mp4" for i in range(len(segments))]
+        # Spawned workers don't inherit the parent's open MoviePy readers
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_render, segment, str(piece), fps, profile, threads)
+                for segment, piece in zip(segments, pieces)
+            ]
+            for future in futures:
+                future.result()
+
+        listing = tmp / "segments.txt"
+        listing.write_text("".join(f"file '{piece.name}'\n" for piece in pieces))
+        # Video first, so it is stream 0 of the output
+        inputs, maps = (["-i", str(audio_path)], ["-map", "1:a"]) if audio_path is not None else ([], [])
+        smartcut.run_ffmpeg(
+            "-f", "concat", "-safe", "0", "-i", str(listing), *inputs,
+            "-map", "0:v", *maps, "-c", "copy", *profile.mux_args(), str(output_path),
+        )
+
+    print(f"  Encoded {len(segments)} segment(s) on {workers} worker(s) ({time.monotonic() - started:.1f}s)")
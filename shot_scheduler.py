@@ -0,0 +1,164 @@
+"""Schedule story shots as a graph of independent scene chains.
+
+A T2V shot opens a new scene and depends on nothing but its prompt and
+reference images. An I2V shot starts from the last frame of the shot right
+before it, so it can only be submitted once that clip has landed. Grouping
+shots into chains (one T2V anchor followed by its I2V continuations) lets
+every chain run in parallel while each chain stays strictly serial.
+
+The longest chain is therefore the critical path of a story. The planning
+helpers below measure it, estimate a story's wall time under a concurrency
+cap, and repair mode sequences whose chains run too long by turning suitable
+I2V shots into T2V re-anchors.
+"""
+
+import asyncio
+import heapq
+import re
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+MAX_CONCURRENT_SHOTS = 4
+MAX_CHAIN_LENGTH = 3  # T2V anchor plus at most two I2V continuations
+EXPECTED_SHOT_SECONDS = 120  # submit-to-saved time of one shot, for wall-time estimates
+
+# An I2V description that opens like this picks up the literal previous frame and can't stand alone
+CONTINUITY_OPENER = re.compile(r"^\W*(continu\w*|picking up|pick up|still|from the previous|as before)\b", re.IGNORECASE)
+
+
+@dataclass
+class ChainOutcome:
+    failed: list[int] = field(default_factory=list)
+    blocked: list[int] = field(default_factory=list)  # I2V successors of a failed shot
+    skipped: list[int] = field(default_factory=list)  # never attempted because the run stopped early
+
+
+def shot_mode(shot: dict) -> str:
+    """Return the generation mode of a shot, defaulting like the story generator does."""
+    return shot.get("mode", "t2v" if shot["id"] == 1 else "i2v")
+
+
+def build_chains(shots: list[dict]) -> list[list[dict]]:
+    """Split shots (sorted by id) into dependency chains.
+
+    An I2V shot joins the chain of the shot immediately before it. Anything
+    else — a T2V shot, or an I2V shot whose predecessor is outside the
+    selected range — starts a new chain.
+    """
+    chains: list[list[dict]] = []
+    for shot in shots:
+        if (
+            shot_mode(shot) == "i2v"
+            and chains
+            and chains[-1][-1]["id"] == shot["id"] - 1
+        ):
+            chains[-1].append(shot)
+        else:
+            chains.append([shot])
+    return chains
+
+
+def critical_path(shots: list[dict]) -> int:
+    """Length, in shots, of the longest chain: the serial part of generating the story."""
+    return max((len(chain) for chain in build_chains(shots)), default=0)
+
+
+def expected_wall_time(
+    shots: list[dict],
+    concurrency: int = MAX_CONCURRENT_SHOTS,
+    shot_seconds: float = EXPECTED_SHOT_SECONDS,
+) -> float:
+    """Seconds `run_chains` would take if every shot took `shot_seconds`.
+
+    Chains start in story order as soon as one of `concurrency` slots frees up.
+    """
+    slots = [0.0] * max(1, concurrency)
+    for chain in build_chains(shots):
+        start = heapq.heappop(slots)
+        heapq.heappush(slots, start + len(chain) * shot_seconds)
+    return max(slots)
+
+
+def can_reanchor(shot: dict) -> bool:
+    """True if an I2V shot could become a T2V shot without losing what it describes.
+
+    That is the case when its description doesn't lean on the previous frame
+    ("Continuing from the previous frame where ...") or when it already
+    names its own reference images.
+    """
+    if shot.get("reference_images"):
+        return True
+    return not CONTINUITY_OPENER.match(str(shot.get("description", "")))
+
+
+def repair_modes(shots: list[dict], max_chain: int = MAX_CHAIN_LENGTH) -> list[int]:
+    """Split chains longer than `max_chain` by turning I2V shots into T2V re-anchors.
+
+    Within each over-long stretch the latest shot that `can_reanchor` is
+    converted, so chains stay as long as the limit allows; it takes the
+    reference images of the anchor it splits from unless it names its own.
+    Mutates `shots` (sorted by id) and returns the converted shot ids.
+    Raises ValueError if a stretch has no shot that can be re-anchored.
+    """
+    converted = []
+    for chain in build_chains(shots):
+        anchor = 0
+        i = max_chain
+        while i < len(chain):
+            candidates = [j for j in range(i, anchor, -1) if can_reanchor(chain[j])]
+            if not candidates:
+                ids = ", ".join(str(s["id"]) for s in chain[anchor:i + 1])
+                raise ValueError(
+                    f"Shots {ids} form an I2V chain longer than {max_chain} with no shot that can start a new scene"
+                )
+            j = candidates[0]
+            shot = chain[j]
+            shot["mode"] = "t2v"
+            if not shot.get("reference_images"):
+                shot["reference_images"] = list(chain[anchor].get("reference_images") or [])
+            converted.append(shot["id"])
+            anchor = j
+            i = j + max_chain
+    return converted
+
+
+async def run_chains(
+    chains: list[list[dict]],
+    run_shot: Callable[[dict], Awaitable[bool]],
+    concurrency: int = MAX_CONCURRENT_SHOTS,
+    semaphore: asyncio.Semaphore | None = None,
+    keep_going: bool = False,
+) -> ChainOutcome:
+    """Run chains concurrently, each one serially, and report what didn't get generated.
+
+    `run_shot` is a coroutine function returning True on success. A failed
+    shot always blocks the rest of its own chain, since those I2V shots need
+    its last frame. By default the first failure also stops every other chain
+    from starting further shots (shots already in flight finish); with
+    `keep_going`, the other chains carry on. Pass a shared `semaphore` to cap
+    chains across several concurrent calls (e.g. every story of a batch)
+    instead of per call.
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+    abort = asyncio.Event()
+    outcome = ChainOutcome()
+
+    async def run_chain(chain: list[dict]) -> None:
+        async with semaphore:
+            for i, shot in enumerate(chain):
+                if abort.is_set():
+                    outcome.skipped.extend(s["id"] for s in chain[i:])
+                    return
+                if not await run_shot(shot):
+                    outcome.failed.append(shot["id"])
+                    outcome.blocked.extend(s["id"] for s in chain[i + 1:])
+                    if not keep_going:
+                        abort.set()
+                    return
+
+    await asyncio.gather(*(run_chain(chain) for chain in chains))
+    outcome.failed.sort()
+    outcome.blocked.sort()
+    outcome.skipped.sort()
+    return outcome
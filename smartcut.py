@@ -0,0 +1,264 @@
+"""Assemble a story by stream copy, re-encoding only around the cuts.
+
+The Veo clips of a story share codec, frame size, frame rate and pixel
+format, so most of every clip can go into the final video bit for bit. For a
+clip whose tail is trimmed (the next shot is I2V), the packets before the last
+keyframe at or before the cut are copied as they are and only the stretch from
+that keyframe to the cut is decoded and re-encoded; the last clip is treated
+the same way from the keyframe before its fade-out. The black closing card is
+encoded with the same settings. The encoding profile sets the preset and
+keyframe interval of the re-encoded pieces; their CRF stays at SMARTCUT_CRF.
+Every piece is written as an Annex B H.264 stream, so each carries its own
+parameter sets in band, and the pieces are joined end to end into one stream
+and muxed without touching the copied packets again.
+
+The result is video only. `assemble` reports how much of each clip it
+kept, so the caller can build a matching audio track (see `audio_mix`) and
+mux it in.
+
+`assemble` raises SmartCutError when the clips can't be joined this way
+(mismatched formats, or a codec other than H.264); the assembler and
+aggregate.py then fall back to re-encoding the whole timeline as parallel
+segments (see `segmented`) with the run's encoding profile.
+"""
+
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from fractions import Fraction
+from pathlib import Path
+
+from encoding_profiles import EncodingProfile
+
+SMARTCUT_CRF = 16  # re-encoded GOPs sit between copied ones, so keep them visually lossless
+PROFILES = {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high"}
+TIME_EPSILON = 1e-3  # seconds; absorbs rounding in timestamps read back from the container
+
+
+class SmartCutError(RuntimeError):
+    """The clips can't be joined by stream copy."""
+
+
+@dataclass(frozen=True)
+class VideoFormat:
+    """A clip's video format; all but the profile must match for clips to be joined by stream copy."""
+
+    codec: str
+    profile: str | None
+    width: int
+    height: int
+    fps: Fraction
+    pix_fmt: str | None
+
+
+@dataclass
+class _Packet:
+    pts: float
+    keyframe: bool
+
+
+@dataclass
+class _Clip:
+    path: Path
+    format: VideoFormat
+    packets: list[_Packet]  # video packets in decode order
+    timescale: int
+
+
+def ffmpeg_exe() -> str:
+    """The ffmpeg binary MoviePy uses (imageio-ffmpeg's, unless overridden)."""
+    from moviepy.config import FFMPEG_BINARY
+
+    return FFMPEG_BINARY
+
+
+def run_ffmpeg(*args: str) -> None:
+    """Run ffmpeg quietly; raises SmartCutError with its stderr on failure."""
+    result = subprocess.run(
+        [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y", *args],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SmartCutError(f"ffmpeg failed: {result.stderr.strip() or result.returncode}")
+
+
+def probe(path: Path) -> _Clip:
+    """Read a clip's video format and packet index (timestamps and keyframes), without decoding."""
+    import av
+
+    try:
+        with av.open(str(path)) as container:
+            if not container.streams.video:
+                raise SmartCutError(f"{path.name} has no video stream")
+            stream = container.streams.video[0]
+            ctx = stream.codec_context
+            rate = stream.average_rate or stream.guessed_rate
+            fmt = VideoFormat(
+                codec=ctx.name,
+                profile=ctx.profile,
+                width=ctx.width,
+                height=ctx.height,
+                fps=Fraction(rate) if rate else Fraction(0),
+                pix_fmt=ctx.format.name if ctx.format is not None else None,
+            )
+            packets = [
+                _Packet(float(p.pts * p.time_base), p.is_keyframe)
+                for p in container.demux(stream)
+                if p.pts is not None
+            ]
+    except av.error.FFmpegError as e:
+        raise SmartCutError(f"cannot read {path.name}: {e}") from e
+    return _Clip(path, fmt, packets, stream.time_base.denominator)
+
+
+def check_compatible(clips: list[_Clip], fps: float) -> VideoFormat:
+    """Return the shared format of `clips`, or raise SmartCutError naming the first mismatch."""
+    first = clips[0].format
+    if first.codec != "h264":
+        raise SmartCutError(f"{clips[0].path.name} is {first.codec}, not H.264")
+    if first.fps != Fraction(fps).limit_denominator(1001):
+        raise SmartCutError(f"{clips[0].path.name} runs at {float(first.fps):g} fps, not {fps:g}")
+    for clip in clips[1:]:
+        # Profiles may differ: every piece of the joined stream carries its own parameter sets
+        if replace(clip.format, profile=first.profile) != first:
+            raise SmartCutError(f"{clip.path.name} differs from {clips[0].path.name}: {clip.format} vs {first}")
+    return first
+
+
+def _encoder_args(fmt: VideoFormat, profile: EncodingProfile) -> list[str]:
+    args = ["-c:v", "libx264", "-preset", profile.preset, *profile.video_args(float(fmt.fps), crf=SMARTCUT_CRF)]
+    args += ["-r", str(fmt.fps)]
+    if fmt.profile in PROFILES:
+        args += ["-profile:v", PROFILES[fmt.profile]]
+    if fmt.pix_fmt:
+        args += ["-pix_fmt", fmt.pix_fmt]
+    return args
+
+
+def join_annexb(pieces: list[Path], dest: Path) -> None:
+    """Join Annex B H.264 streams end to end; each keeps its own in-band parameter sets."""
+    with open(dest, "wb") as joined:
+        for piece in pieces:
+            with open(piece, "rb") as f:
+                shutil.copyfileobj(f, joined)
+
+
+@dataclass
+class _Segment:
+    path: Path
+    frames: int
+    copied: bool
+
+
+def _split(clip: _Clip, end: float | None, fade: float | None) -> tuple[int, float, float, int]:
+    """Plan one clip: (packets to copy, re-encode start, re-encode end, frames re-encoded).
+
+    Keeps the frames before `end` (all of them if None). If `fade` is given,
+    the last `fade` seconds of what is kept must be re-encoded too. The copy
+    stops at the last keyframe at or before the first frame that needs
+    re-encoding; with open GOPs the re-encode then starts at the earliest
+    frame the copied packets don't cover.
+    """
+    pts = sorted(p.pts for p in clip.packets)
+    last = pts[-1] + 1 / float(clip.format.fps)
+    end = last if end is None else min(end, last)
+    kept = [t for t in pts if t < end - TIME_EPSILON]
+    first_changed = end if fade is None else max(0.0, end - fade)
+    if end >= last - TIME_EPSILON and fade is None:
+        return len(clip.packets), end, end, 0
+
+    cut = 0
+    for i, packet in enumerate(clip.packets):
+        if packet.keyframe and packet.pts <= first_changed + TIME_EPSILON:
+            cut = i
+    start = min((p.pts for p in clip.packets[cut:]), default=end)
+    if fade is None and start >= end - TIME_EPSILON:
+        return cut, end, end, 0  # the cut falls on a keyframe: nothing to re-encode
+    frames = sum(1 for t in kept if t >= start - TIME_EPSILON)
+    return cut, start, end, frames
+
+
+def _copy(clip: _Clip, packets: int, out: Path) -> None:
+    run_ffmpeg("-i", str(clip.path), "-map", "0:v:0", "-c", "copy", "-frames:v", str(packets), "-f", "h264", str(out))
+
+
+def _reencode(clip: _Clip, start: float, frames: int, fade: tuple[float, float] | None, profile: EncodingProfile, out: Path) -> None:
+    filters = []
+    if fade is not None:
+        filters = ["-vf", f"fade=t=out:st={fade[0]:.6f}:d={fade[1]:.6f}"]
+    run_ffmpeg(
+        "-ss", f"{start:.6f}", "-i", str(clip.path), "-map", "0:v:0", *filters,
+        "-frames:v", str(frames), *_encoder_args(clip.format, profile), "-f", "h264", str(out),
+    )
+
+
+def _black(fmt: VideoFormat, frames: int, profile: EncodingProfile, out: Path) -> None:
+    run_ffmpeg(
+        "-f", "lavfi", "-i", f"color=c=black:s={fmt.width}x{fmt.height}:r={fmt.fps}",
+        "-frames:v", str(frames), *_encoder_args(fmt, profile), "-f", "h264", str(out),
+    )
+
+
+def assemble(
+    cuts: list[tuple[Path, float | None]],
+    output_path: Path,
+    fps: float,
+    fade: float,
+    black: float,
+    profile: EncodingProfile,
+) -> list[float]:
+    """Join (clip, keep-until seconds or None for all of it) pairs into a video-only `output_path`.
+
+    Fades the end of the last clip to black over `fade` seconds and appends
+    `black` seconds of black, like the segmented re-encode; with both at 0 and no
+    cuts, every clip is copied whole. Returns the seconds kept of each clip.
+    """
+    started = time.monotonic()
+    clips = [probe(path) for path, _ in cuts]
+    fmt = check_compatible(clips, fps)
+    frame = 1 / float(fmt.fps)
+
+    with tempfile.TemporaryDirectory(prefix="smartcut-", dir=output_path.parent) as tmp:
+        tmp = Path(tmp)
+        segments: list[_Segment] = []
+        kept: list[float] = []
+        for i, (clip, (_, end)) in enumerate(zip(clips, cuts)):
+            is_last = i == len(clips) - 1
+            copy_packets, start, stop, frames = _split(clip, end, fade if is_last and fade else None)
+            copied_frames = sum(1 for p in clip.packets[:copy_packets] if p.pts < stop - TIME_EPSILON)
+            if copy_packets:
+                path = tmp / f"{i:03d}_copy.h264"
+                _copy(clip, copy_packets, path)
+                segments.append(_Segment(path, copied_frames, True))
+            if frames:
+                path = tmp / f"{i:03d}_cut.h264"
+                fade_window = None
+                if is_last:
+                    length = min(fade, stop)
+                    fade_window = (max(0.0, stop - length - start), length)
+                _reencode(clip, start, frames, fade_window, profile, path)
+                segments.append(_Segment(path, frames, False))
+            kept.append((copied_frames + frames) * frame)
+        black_frames = round(black * float(fmt.fps))
+        if black_frames:
+            path = tmp / "black.h264"
+            _black(fmt, black_frames, profile, path)
+            segments.append(_Segment(path, black_frames, False))
+
+        stream = tmp / "video.h264"
+        join_annexb([s.path for s in segments], stream)
+
+        # Constant rate: the joined stream carries no timestamps
+        run_ffmpeg(
+            "-r", str(fmt.fps), "-i", str(stream), "-c:v", "copy",
+            "-video_track_timescale", str(clips[0].timescale), str(output_path),
+        )
+
+    total_frames = sum(s.frames for s in segments)
+    copied = sum(s.frames for s in segments if s.copied)
+    reencoded = [s for s in segments if not s.copied]
+    print(f"  Stream-copied {copied}/{total_frames} frames; re-encoded {len(reencoded)} segment(s), "
+          f"{sum(s.frames for s in reencoded) * frame:.1f}s ({time.monotonic() - started:.1f}s)")
+    return kept
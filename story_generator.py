@@ -2,6 +2,11 @@
 
 Uses Gemini 3.1 Pro to produce 15 shot descriptions from an optional idea,
 then writes the result to stories/{video_id}.yaml.
+
+Before saving, the shot modes are planned for parallel generation: I2V chains
+longer than --max_chain are split with T2V re-anchors where a shot allows it
+(see `shot_scheduler.repair_modes`), and a story that can't be repaired is
+generated again.
 """
 
 import argparse
@@ -13,7 +18,6 @@ import subprocess
 
 import yaml
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
 load_dotenv()
@@ -21,7 +25,13 @@ load_dotenv()
 # gemini-3.1-pro-preview is only available on the Gemini API, not Vertex AI.
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "false"
 
+import clients
 import prompt_builder
+import rate_limiter
+import shot_scheduler
+
+MODEL = "gemini-3.1-pro-preview"
+MAX_STORY_ATTEMPTS = 3  # generations before giving up on a story whose plan can't be repaired
 
 
 
@@ -103,8 +113,30 @@ def validate_story(data: dict, num_shots: int = 15) -> None:
     shots[0]["mode"] = "t2v"
 
 
-def generate_story(aspect_ratio: str, idea: str | None, channel: dict, num_shots: int = 15, shot_duration: int = 8) -> dict:
-    client = genai.Client()
+def plan_story(data: dict, max_chain: int = shot_scheduler.MAX_CHAIN_LENGTH,
+               concurrency: int = shot_scheduler.MAX_CONCURRENT_SHOTS) -> None:
+    """Repair the story's mode sequence for parallel generation and print its schedule.
+
+    Raises ValueError if an over-long I2V chain has no shot that can be re-anchored.
+    """
+    shots = sorted(data["shots"], key=lambda s: s["id"])
+    before = shot_scheduler.critical_path(shots)
+    converted = shot_scheduler.repair_modes(shots, max_chain)
+    if converted:
+        print(f"  Re-anchored shot(s) {', '.join(map(str, converted))} as T2V "
+              f"(longest chain {before} -> {shot_scheduler.critical_path(shots)} shots)")
+
+    chains = shot_scheduler.build_chains(shots)
+    wall = shot_scheduler.expected_wall_time(shots, concurrency)
+    serial = shot_scheduler.expected_wall_time(shots, 1)
+    print(f"  Plan: {len(chains)} scene chains, critical path {shot_scheduler.critical_path(shots)} shots, "
+          f"~{wall / 60:.0f} min at concurrency {concurrency} (~{serial / 60:.0f} min serially)")
+
+
+def generate_story(aspect_ratio: str, idea: str | None, channel: dict, num_shots: int = 15, shot_duration: int = 8,
+                   max_chain: int = shot_scheduler.MAX_CHAIN_LENGTH,
+                   concurrency: int = shot_scheduler.MAX_CONCURRENT_SHOTS) -> dict:
+    client = clients.make_client()
     idea_line = f"Story idea: {idea}" if idea else "Generate an original story idea. Be creative and engaging."
 
     user_prompt = prompt_builder.build_story_user_prompt(
@@ -113,24 +145,33 @@ def generate_story(aspect_ratio: str, idea: str | None, channel: dict, num_shots
         shot_dur=shot_duration,
         total_dur=shot_duration * num_shots,
         idea_line=idea_line,
-        num_shots=num_shots
+        num_shots=num_shots,
+        max_chain=max_chain,
     )
 
     system_prompt = prompt_builder.build_story_system_prompt(channel)
 
-    response = client.models.generate_content(
-        model="gemini-3.1-pro-preview",
-        contents=user_prompt,
-        config=types.GenerateContentConfig(
-            system_instruction=system_prompt,
-            temperature=1.0,
-        ),
-    )
+    for attempt in range(1, MAX_STORY_ATTEMPTS + 1):
+        rate_limiter.acquire(MODEL)
+        response = client.models.generate_content(
+            model=MODEL,
+            contents=user_prompt,
+            config=types.GenerateContentConfig(
+                system_instruction=system_prompt,
+                temperature=1.0,
+            ),
+        )
 
-    raw_yaml = extract_yaml_block(response.text)
-    data = parse_story_yaml(raw_yaml)
-    validate_story(data, num_shots)
-    return data
+        raw_yaml = extract_yaml_block(response.text)
+        data = parse_story_yaml(raw_yaml)
+        validate_story(data, num_shots)
+        try:
+            plan_story(data, max_chain, concurrency)
+            return data
+        except ValueError as e:
+            if attempt == MAX_STORY_ATTEMPTS:
+                raise
+            print(f"  Rejected plan ({e}); generating again ({attempt}/{MAX_STORY_ATTEMPTS})")
 
 
 def main() -> None:
@@ -141,7 +182,13 @@ def main() -> None:
     parser.add_argument("--video_id", required=True, help="Video identifier (used as output filename).")
     parser.add_argument("--num_shots", type=int, default=15, help="Number of shots to generate.")
     parser.add_argument("--shot_duration", type=int, choices=[4, 6, 8], default=8, help="Duration per shot in seconds.")
+    parser.add_argument("--max_chain", type=int, default=shot_scheduler.MAX_CHAIN_LENGTH,
+                        help=f"Longest run of a T2V shot plus its I2V continuations (default: {shot_scheduler.MAX_CHAIN_LENGTH}).")
+    parser.add_argument("--concurrency", type=int, default=shot_scheduler.MAX_CONCURRENT_SHOTS,
+                        help="Scene chains generated at once, for the wall-time estimate.")
     args = parser.parse_args()
+    if args.max_chain < 1:
+        parser.error("--max_chain must be at least 1")
 
     try:
         channel_config = prompt_builder.load_channel_config(args.channel)
@@ -155,7 +202,8 @@ def main() -> None:
     else:
         print("  No idea provided — AI will generate one from scratch.")
 
-    story = generate_story(args.aspect_ratio, args.idea, channel_config, args.num_shots, args.shot_duration)
+    story = generate_story(args.aspect_ratio, args.idea, channel_config, args.num_shots, args.shot_duration,
+                           args.max_chain, args.concurrency)
 
     metadata = {
         "channel": args.channel,
@@ -5,17 +5,24 @@ Layout: One puppy on each side of the board, Pop holding the board.
 Output path: output/subscribe.mp4
 """
 
-import base64
-import mimetypes
+import asyncio
 import os
 import sys
-import time
 from pathlib import Path
 
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+import clients
+import downloader
+import latency_model
+import mp4
+import rate_limiter
+import ref_assets
+import retry_policy
+from operation_poller import OperationPoller, deadline_for
+
 load_dotenv()
 
 USE_VERTEX = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "false").lower() == "true"
@@ -58,36 +65,58 @@ DESCRIPTION = (
     "The lighting is bright and cheerful, suggesting a perfect sunny day."
 )
 
-def make_ref_image_config(image_bytes: bytes, mime_type: str) -> types.VideoGenerationReferenceImage:
+def make_ref_image_config(ref: ref_assets.RefImage) -> types.VideoGenerationReferenceImage:
     return types.VideoGenerationReferenceImage(
         image=types.Image(
-            image_bytes=base64.b64encode(image_bytes).decode("utf-8"),
-            mime_type=mime_type,
+            image_bytes=ref.b64,
+            mime_type=ref.mime_type,
         ),
         reference_type="asset",
     )
 
-def _poll_and_download(client: genai.Client, operation):
-    """Poll until done, then download and return the video object."""
-    while not operation.done:
-        print("  Polling...")
-        time.sleep(15)
-        operation = client.operations.get(operation)
-
-    if operation.response is None:
-        error = getattr(operation, "error", None)
-        raise RuntimeError(f"Video generation failed (no response): {error}")
+async def _poll_and_download(client: genai.Client, operation, out_path: Path) -> None:
+    """Poll until done, then stream the video to out_path."""
+    print("  Polling...")
+    key = latency_model.key_for(MODEL, RESOLUTION, DURATION, "t2v")
+    poller = OperationPoller(latency=latency_model.LatencyModel())
+    operation = await poller.wait(client, operation, key, deadline_for(MODEL, DURATION))
 
-    if not operation.response.generated_videos:
-        raise RuntimeError(f"Video generation failed (no videos returned): {operation}")
-
-    video = operation.response.generated_videos[0]
-    if not USE_VERTEX:
-        client.files.download(file=video.video)
-    return video.video
+    await downloader.download_video(retry_policy.generated_video(operation), out_path)
+    retry_policy.record_success(MODEL)
+    try:
+        mp4.validate_clip(out_path, DURATION, ASPECT_RATIO, RESOLUTION)
+    except mp4.MP4Error:
+        out_path.unlink()
+        raise
+
+
+async def _generate(client: genai.Client, prompt: str, config: types.GenerateVideosConfig, out_path: Path) -> None:
+    """Submit, poll and download, resubmitting overdue or failed operations per the retry policy."""
+    retry = retry_policy.Retry(MODEL)
+    while True:
+        try:
+            await retry_policy.wait_for_circuit_async(MODEL)
+            await rate_limiter.acquire_async(MODEL)
+            operation = await client.aio.models.generate_videos(
+                model=MODEL,
+                prompt=prompt,
+                config=config,
+            )
+            await _poll_and_download(client, operation, out_path)
+            return
+        except Exception as e:
+            wait = retry.next_delay(e)
+            if wait is None:
+                raise
+            if retry.last_class == retry_policy.QUOTA:
+                print(f"  Rate limited, backing off {wait:.0f}s (attempt {retry.attempts})")
+                rate_limiter.penalize(MODEL, wait)
+            else:
+                print(f"  {retry.last_class} error — {e}; retrying in {wait:.0f}s")
+                await asyncio.sleep(wait)
 
 def generate_subscribe_shot() -> None:
-    client = genai.Client()
+    client = clients.make_client()
 
     # Verify ref images
     char_refs = []
@@ -96,8 +125,7 @@ def generate_subscribe_shot() -> None:
         if not path.exists():
             print(f"Error: reference image not found: {img_path}", file=sys.stderr)
             sys.exit(1)
-        mime = mimetypes.guess_type(img_path)[0] or "image/jpeg"
-        char_refs.append(make_ref_image_config(path.read_bytes(), mime))
+        char_refs.append(make_ref_image_config(ref_assets.load_ref(path)))
 
     print(f"Loaded {len(char_refs)} character reference images.")
 
@@ -118,14 +146,7 @@ def generate_subscribe_shot() -> None:
     }
 
     try:
-        operation = client.models.generate_videos(
-            model=MODEL,
-            prompt=prompt,
-            config=types.GenerateVideosConfig(**config_kwargs),
-        )
-        video_file = _poll_and_download(client, operation)
-
-        video_file.save(str(out_path))
+        asyncio.run(_generate(client, prompt, types.GenerateVideosConfig(**config_kwargs), out_path))
         print(f"Saved to {out_path} ({out_path.stat().st_size / 1024 / 1024:.1f} MB)")
 
     except Exception as e:
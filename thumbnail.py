@@ -10,20 +10,39 @@ from pathlib import Path
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
-from PIL import Image
 
+import clients
+import content_cache
 import prompt_builder
+import rate_limiter
+import ref_assets
 
 load_dotenv()
 
 USE_VERTEX = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "false").lower() == "true"
 MODEL = "gemini-3-pro-image-preview"
+ASPECT_RATIO = "16:9"
+IMAGE_SIZE = "1K"  # Using 1K as it's a good preview size, could be "2K" or "4K"
+
+
+def load_refs(ref_image_paths: list[Path]) -> list[ref_assets.RefImage]:
+    """Load the upload-ready form of each reference image, skipping missing or unreadable ones."""
+    refs = []
+    for p in ref_image_paths:
+        if not p.exists():
+            print(f"  Warning: Reference image not found: {p}")
+            continue
+        try:
+            refs.append(ref_assets.load_ref(p))
+        except Exception as e:
+            print(f"  Warning: Failed to load image {p}: {e}")
+    return refs
 
 
 def generate_thumbnail(
     client: genai.Client,
     prompt: str,
-    ref_image_paths: list[Path],
+    refs: list[ref_assets.RefImage],
     output_path: Path
 ) -> None:
     """Generates a thumbnail using Gemini and saves it."""
@@ -31,34 +50,22 @@ def generate_thumbnail(
     print(f"Generating thumbnail for '{output_path.name}'...")
     print(f"  Prompt preview: {prompt[:100]}...")
 
-    # Prepare contents list starting with the prompt
+    # Prompt first, then the prepared reference images
     contents = [prompt]
+    contents += [types.Part.from_bytes(data=ref.data, mime_type=ref.mime_type) for ref in refs]
 
-    # Load and append valid reference images
-    loaded_refs = 0
-    for p in ref_image_paths:
-        if not p.exists():
-            print(f"  Warning: Reference image not found: {p}")
-            continue
-        try:
-            # Open with PIL to verify and pass to API
-            img = Image.open(p)
-            contents.append(img)
-            loaded_refs += 1
-        except Exception as e:
-            print(f"  Warning: Failed to load image {p}: {e}")
-
-    print(f"  Using {loaded_refs} reference images.")
+    print(f"  Using {len(refs)} reference images.")
 
     try:
+        rate_limiter.acquire(MODEL)
         response = client.models.generate_content(
             model=MODEL,
             contents=contents,
             config=types.GenerateContentConfig(
                 response_modalities=['IMAGE'],
                 image_config=types.ImageConfig(
-                    aspect_ratio="16:9",
-                    image_size="1K" # Using 1K as it's a good preview size, could be "2K" or "4K"
+                    aspect_ratio=ASPECT_RATIO,
+                    image_size=IMAGE_SIZE,
                 ),
             )
         )
@@ -114,10 +121,6 @@ def process_story_file(story_path: Path, client: genai.Client, channel_override:
     output_dir.mkdir(parents=True, exist_ok=True)
     output_path = output_dir / f"{story_name}_thumbnail.png"
 
-    if output_path.exists():
-        print(f"Thumbnail already exists: {output_path}, skipping.")
-        return
-
     # Gather reference images
     # 1. Base character refs
     ref_images = []
@@ -129,14 +132,33 @@ def process_story_file(story_path: Path, client: genai.Client, channel_override:
     # Note: Using video_id/story_name matches the structure you implied
     story_ref_dir = Path("assets/ref") / video_id / story_name
     if story_ref_dir.exists():
-        for item in story_ref_dir.iterdir():
+        for item in sorted(story_ref_dir.iterdir()):
             if item.is_file() and item.suffix.lower() in ['.png', '.jpg', '.jpeg', '.webp']:
                 ref_images.append(item)
 
     # Construct prompt
     prompt = prompt_builder.build_thumbnail_prompt(channel_config, concept)
 
-    generate_thumbnail(client, prompt, ref_images, output_path)
+    refs = load_refs(ref_images)
+
+    # Key on everything that shapes the image so edited concepts or refs are regenerated
+    key = content_cache.content_key(
+        MODEL, prompt, refs=[ref.data for ref in refs],
+        aspect_ratio=ASPECT_RATIO, resolution=IMAGE_SIZE,
+    )
+    if output_path.exists():
+        if content_cache.is_current(output_path, key):
+            print(f"Thumbnail already exists: {output_path}, skipping.")
+            return
+        print(f"Thumbnail inputs changed since {output_path} was generated, regenerating.")
+        output_path.unlink()
+    if content_cache.fetch(key, output_path):
+        print(f"Thumbnail served from cache: {output_path}")
+        return
+
+    generate_thumbnail(client, prompt, refs, output_path)
+    if output_path.exists():
+        content_cache.store(key, output_path)
 
 
 def main() -> None:
@@ -146,7 +168,7 @@ def main() -> None:
     args = parser.parse_args()
 
     try:
-        client = genai.Client()
+        client = clients.make_client()
     except Exception as e:
         print(f"Error initializing GenAI client: {e}")
         return
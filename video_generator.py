@@ -5,107 +5,155 @@ Each shot has a mode field ("t2v" or "i2v") set by the story generator:
     to re-anchor character identity.
   - I2V: image-to-video using the last frame of the previous shot as the starting
     frame. Used for continuation shots within a scene for smooth visual continuity.
+
+With --draft, the story is generated at DRAFT_RESOLUTION with DRAFT_MODEL into
+output/{video_id}/draft_clips/ for review (see `assembler.py --review`). --promote
+then regenerates the approved shots at full resolution into raw_clips/ with the
+same prompts and reference images. A promoted I2V shot starts from the frame
+its draft started from, unless its predecessor has been promoted as well, in
+which case it continues from the promoted clip so the final cut stays seamless.
 """
 
 import argparse
+import asyncio
 import base64
-import mimetypes
-import os
-import subprocess
+import json
+import shlex
 import sys
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import yaml
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
 load_dotenv()
 
-USE_VERTEX = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "false").lower() == "true"
-
+import clients
+import content_cache
+import downloader
+import frames
+import hedging
+import latency_model
+import mp4
+import operation_poller
 import prompt_builder
+import ref_assets
+import retry_policy
+import shot_scheduler
+from job_journal import JobJournal, ShotJob
+from operation_poller import OperationPoller, PollUnavailable
 
 MODEL = "veo-3.1-fast-generate-preview"
 RESOLUTION = "1080p"  # "720p" | "1080p" | "4k"
+DRAFT_MODEL = "veo-3.1-fast-generate-preview"
+DRAFT_RESOLUTION = "720p"
+REPORT_DIR = Path("output") / ".state" / "reports"
 
 
+@dataclass(frozen=True)
+class Tier:
+    """Model, resolution and clip folder of one quality level."""
 
-POLL_INTERVAL_SECONDS = 15
-DELAY_BETWEEN_SHOTS_SECONDS = 5
-MAX_RETRIES = 3
-RETRY_BACKOFF_SECONDS = 60
-MIN_VALID_BYTES = 1 * 1024 * 1024
+    name: str
+    model: str
+    resolution: str
+    clip_folder: str
 
+    def clips_dir(self, video_id: str, story_name: str) -> Path:
+        return Path("output") / video_id / self.clip_folder / story_name
 
-def extract_last_frame(video_path: str, offset_from_end: float) -> bytes:
-    """Extract a frame near the end of a video using ffmpeg. Returns JPEG bytes."""
-    result = subprocess.run(
-        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-         "-of", "default=noprint_wrappers=1:nokey=1", video_path],
-        capture_output=True, text=True, check=True,
-    )
-    duration = float(result.stdout.strip())
-    timestamp = max(0, duration - offset_from_end)
 
-    frame_result = subprocess.run(
-        ["ffmpeg", "-y", "-ss", str(timestamp), "-i", video_path,
-         "-frames:v", "1", "-q:v", "2", "-f", "image2pipe", "-vcodec", "mjpeg", "pipe:1"],
-        capture_output=True, check=True,
-    )
-    return frame_result.stdout
+FINAL = Tier("final", MODEL, RESOLUTION, "raw_clips")
+DRAFT = Tier("draft", DRAFT_MODEL, DRAFT_RESOLUTION, "draft_clips")
+
+
+@dataclass
+class StoryResult:
+    """What one story's run left ungenerated."""
+
+    story_path: Path
+    failed: dict[int, str] = field(default_factory=dict)  # shot id -> "<error class>: <message>"
+    blocked: list[int] = field(default_factory=list)  # I2V successors of a failed shot
+    skipped: list[int] = field(default_factory=list)  # not attempted because the run stopped early
 
+    @property
+    def incomplete(self) -> list[int]:
+        return sorted([*self.failed, *self.blocked, *self.skipped])
 
-def make_ref_image_config(image_bytes: bytes, mime_type: str) -> types.VideoGenerationReferenceImage:
+    def regenerate_command(self, extra_args: list[str] = ()) -> str | None:
+        """Command that generates exactly the shots this run left behind."""
+        if not self.incomplete:
+            return None
+        argv = [
+            "python", "video_generator.py", "--story", str(self.story_path),
+            "--shots", ",".join(map(str, self.incomplete)), "--keep_going", *extra_args,
+        ]
+        return shlex.join(argv)
+
+
+def make_ref_image_config(ref: ref_assets.RefImage) -> types.VideoGenerationReferenceImage:
     return types.VideoGenerationReferenceImage(
         image=types.Image(
-            image_bytes=base64.b64encode(image_bytes).decode("utf-8"),
-            mime_type=mime_type,
+            image_bytes=ref.b64,
+            mime_type=ref.mime_type,
         ),
         reference_type="asset",
     )
 
 
-def generate_shot_t2v(
-    client: genai.Client,
+async def generate_shot_t2v(
+    client: clients.ClientPool,
+    poller: OperationPoller,
     prompt: str,
     aspect_ratio: str,
     duration: int,
     char_refs: list[types.VideoGenerationReferenceImage] | None = None,
+    job: ShotJob | None = None,
+    hedger: hedging.Hedger | None = None,
+    tier: Tier = FINAL,
 ) -> bytes:
     """Text-to-video with optional character reference images."""
     config_kwargs = {
         "aspect_ratio": aspect_ratio,
         "number_of_videos": 1,
         "duration_seconds": duration,
-        "resolution": RESOLUTION,
+        "resolution": tier.resolution,
     }
     if char_refs:
         config_kwargs["reference_images"] = char_refs
 
-    operation = client.models.generate_videos(
-        model=MODEL,
-        prompt=prompt,
-        config=types.GenerateVideosConfig(**config_kwargs),
-    )
-    return _poll_and_download(client, operation)
+    async def submit(member):
+        return await member.aio.models.generate_videos(
+            model=tier.model,
+            prompt=prompt,
+            config=types.GenerateVideosConfig(**config_kwargs),
+        )
 
+    key = latency_model.key_for(tier.model, tier.resolution, duration, "t2v")
+    deadline = operation_poller.deadline_for(tier.model, duration)
+    return await _run_operation(client, poller, submit, key, job, hedger, deadline, tier.model)
 
-def generate_shot_i2v(
-    client: genai.Client,
+
+async def generate_shot_i2v(
+    client: clients.ClientPool,
+    poller: OperationPoller,
     prompt: str,
     aspect_ratio: str,
     duration: int,
     channel: dict,
     start_frame: bytes,
+    job: ShotJob | None = None,
+    hedger: hedging.Hedger | None = None,
+    tier: Tier = FINAL,
 ) -> bytes:
     """Image-to-video — the start_frame becomes the literal first frame."""
     config_kwargs = {
         "aspect_ratio": aspect_ratio,
         "number_of_videos": 1,
         "duration_seconds": duration,
-        "resolution": RESOLUTION,
+        "resolution": tier.resolution,
     }
 
 
@@ -113,59 +161,135 @@ def generate_shot_i2v(
         image_bytes=base64.b64encode(start_frame).decode("utf-8"),
         mime_type="image/jpeg",
     )
-    operation = client.models.generate_videos(
-        model=MODEL,
-        prompt=prompt,
-        image=start_image,
-        config=types.GenerateVideosConfig(**config_kwargs),
-    )
-    return _poll_and_download(client, operation)
-
 
-def _poll_and_download(client: genai.Client, operation):
-    """Poll until done, then download and return the video object."""
-    while not operation.done:
-        time.sleep(POLL_INTERVAL_SECONDS)
-        operation = client.operations.get(operation)
+    async def submit(member):
+        return await member.aio.models.generate_videos(
+            model=tier.model,
+            prompt=prompt,
+            image=start_image,
+            config=types.GenerateVideosConfig(**config_kwargs),
+        )
+
+    key = latency_model.key_for(tier.model, tier.resolution, duration, "i2v")
+    deadline = operation_poller.deadline_for(tier.model, duration)
+    return await _run_operation(client, poller, submit, key, job, hedger, deadline, tier.model)
+
+
+async def _run_operation(
+    client: clients.ClientPool,
+    poller: OperationPoller,
+    submit,
+    key: str,
+    job: ShotJob | None,
+    hedger: hedging.Hedger | None = None,
+    deadline: float | None = None,
+    model: str = MODEL,
+):
+    """Re-attach to a journaled operation for this request, or submit a new one, then wait for its video.
+
+    `submit(client)` sends the request with whichever credential's client the
+    pool picks. With a `hedger`, an operation that runs past the hedging percentile is
+    raced against an identical duplicate request. An operation still running
+    after `deadline` seconds, or stuck, raises OperationTimeout so the
+    caller's retry loop resubmits it. If the operation can't be polled
+    (PollUnavailable), its journal entry stays "running" and the next attempt
+    re-attaches to it.
+    """
+    async def submit_new():
+        await retry_policy.wait_for_circuit_async(model)
+        return await client.submit_async(model, submit)
+
+    operation = await job.resume(client) if job is not None else None
+    if operation is not None:
+        print(f"  Shot {job.shot_id}: re-attached to {operation.name}")
+    else:
+        operation = await submit_new()
+        if job is not None:
+            job.submitted(operation.name)
+    # Deadlines and latency samples count from the original submission, even after re-attaching
+    submitted_at = job.submitted_at if job is not None else time.time()
 
-    if operation.response is None:
-        error = getattr(operation, "error", None)
-        raise RuntimeError(f"Video generation failed (no response): {error}")
-
-    if not operation.response.generated_videos:
-        raise RuntimeError(f"Video generation failed (no videos returned): {operation}")
-
-    video = operation.response.generated_videos[0]
-    if not USE_VERTEX:
-        client.files.download(file=video.video)
-    return video.video
-
-
-def process_story(
+    try:
+        if hedger is not None:
+            operation = await hedger.wait(poller, client, operation, key, submit_new, job, submitted_at, deadline)
+            video = retry_policy.generated_video(operation)
+        else:
+            video = await _wait_for_video(client, poller, operation, key, deadline, submitted_at)
+    except PollUnavailable:
+        raise
+    except Exception as e:
+        if job is not None:
+            job.finished("failed", str(e))
+        raise
+    retry_policy.record_success(model)
+    if job is not None:
+        job.finished("done")
+    return video
+
+
+async def _wait_for_video(
+    client: clients.ClientPool, poller: OperationPoller, operation, key: str | None = None, deadline: float | None = None,
+    submitted_at: float | None = None,
+):
+    """Wait for the shared poller to report the operation done and return the generated video object."""
+    operation = await poller.wait(client, operation, key, deadline, submitted_at)
+    return retry_policy.generated_video(operation)
+
+
+async def generate_story(
     story_path: str,
     channel_config: dict,
     shot_duration: int,
     aspect_ratio: str,
+    client: clients.ClientPool,
+    poller: OperationPoller,
     start_shot: int = 1,
     end_shot: int | None = None,
-) -> None:
+    concurrency: int = shot_scheduler.MAX_CONCURRENT_SHOTS,
+    journal: JobJournal | None = None,
+    use_cache: bool = True,
+    semaphore: asyncio.Semaphore | None = None,
+    label: str = "",
+    shot_ids: set[int] | None = None,
+    keep_going: bool = False,
+    hedger: hedging.Hedger | None = None,
+    tier: Tier = FINAL,
+    promote: bool = False,
+) -> StoryResult:
+    """Generate every missing shot of one story and report the shots left ungenerated.
+
+    With a `journal`, every submitted operation is recorded so an interrupted
+    run re-attaches to it instead of resubmitting the same request. With
+    `use_cache`, a shot whose exact request was generated before is copied
+    from the content cache instead of being regenerated. A shared `semaphore`
+    caps scene chains across every story of a batch; `label` prefixes the
+    story's log lines. `shot_ids` restricts the run to those shots. With
+    `keep_going`, a failed shot only blocks the I2V shots that continue from
+    it instead of stopping the whole story. A shared `hedger` duplicates
+    operations that run unusually long. `tier` picks the model, resolution
+    and clip folder; `promote` regenerates drafted shots (all of them, unless
+    `shot_ids` names the approved ones) at full resolution.
+    """
     path = Path(story_path)
     with open(path) as f:
         story = yaml.safe_load(f)
 
     video_id = path.parent.name
     story_name = path.stem
-    out_dir = Path("output") / video_id / "raw_clips" / story_name
+    out_dir = tier.clips_dir(video_id, story_name)
     out_dir.mkdir(parents=True, exist_ok=True)
+    draft_dir = DRAFT.clips_dir(video_id, story_name)
+    if promote and shot_ids is None:
+        shot_ids = {int(p.stem) for p in draft_dir.glob("*.mp4") if p.stem.isdigit()}
 
-
-    client = genai.Client()
     all_shots = sorted(story["shots"], key=lambda s: s["id"])
     shots = [s for s in all_shots
-             if s["id"] >= start_shot and (end_shot is None or s["id"] <= end_shot)]
+             if s["id"] >= start_shot and (end_shot is None or s["id"] <= end_shot)
+             and (shot_ids is None or s["id"] in shot_ids)]
 
-    print(f"Generating {len(shots)} shots (frame-continuity mode) for '{story.get('title', story_name)}'")
-    print(f"  Type: {aspect_ratio}, Duration: {shot_duration}s/shot")
+    action = "Promoting" if promote else "Drafting" if tier is DRAFT else "Generating"
+    print(f"{label}{action} {len(shots)} shots (frame-continuity mode) for '{story.get('title', story_name)}'")
+    print(f"  Type: {aspect_ratio}, Duration: {shot_duration}s/shot, {tier.resolution} ({tier.model})")
     if start_shot > 1 or end_shot is not None:
         range_str = f"{start_shot}–{end_shot if end_shot is not None else 'end'}"
         print(f"  Shot range: {range_str}")
@@ -177,18 +301,29 @@ def process_story(
         if "id" in char and "ref_image" in char:
             channel_refs[char["id"]] = char["ref_image"]
 
-    for shot in shots:
+    frame_offset = channel_config.get("video_settings", {}).get("frame_offset_seconds", 1.0)
+    modes = {s["id"]: shot_scheduler.shot_mode(s) for s in all_shots}
+
+    chains = shot_scheduler.build_chains(shots)
+    if semaphore is None:
+        print(f"  Scheduling {len(chains)} scene chain(s), up to {concurrency} in flight")
+    else:
+        print(f"  Scheduling {len(chains)} scene chain(s) under the batch concurrency cap")
+
+    async def run_shot(shot: dict) -> bool:
         shot_id = shot["id"]
+        tag = f"{label}Shot {shot_id}"
         out_path = out_dir / f"{shot_id}.mp4"
 
-        if out_path.exists():
-            print(f"  Shot {shot_id}: already exists, skipping")
-            continue
+        if out_path.exists() and content_cache.read_stamp(out_path) is None:
+            print(f"  {tag}: already exists, skipping")
+            return True
 
-        shot_mode = shot.get("mode", "t2v" if shot_id == 1 else "i2v")
+        shot_mode = shot_scheduler.shot_mode(shot)
 
         # Determine Reference Images for this shot
         char_refs = []
+        ref_bytes = []
         if shot_mode == "t2v" and "reference_images" in shot:
             for ref_id in shot["reference_images"]:
                 # Check channel first
@@ -198,24 +333,27 @@ def process_story(
                     img_path = Path("assets") / "ref" / video_id / story_name / f"{ref_id}.png"
 
                 if img_path.exists():
-                    mime = mimetypes.guess_type(img_path)[0] or "image/jpeg"
-                    char_refs.append(make_ref_image_config(img_path.read_bytes(), mime))
+                    ref = ref_assets.load_ref(img_path)
+                    ref_bytes.append(ref.data)
+                    char_refs.append(make_ref_image_config(ref))
                 else:
-                    print(f"  Shot {shot_id}: WARNING - Reference image '{ref_id}' not found at {img_path}")
+                    print(f"  {tag}: WARNING - Reference image '{ref_id}' not found at {img_path}")
 
         # I2V: extract last frame from previous shot; fall back to T2V if unavailable
         start_frame = None
         if shot_mode == "i2v":
             prev_path = out_dir / f"{shot_id - 1}.mp4"
+            if promote and not prev_path.exists():
+                # Predecessor not promoted: start from the same frame the draft did
+                prev_path = draft_dir / f"{shot_id - 1}.mp4"
             if prev_path.exists():
                 try:
-                    offset = channel_config.get("video_settings", {}).get("frame_offset_seconds", 1.0)
-                    start_frame = extract_last_frame(str(prev_path), offset)
+                    start_frame = await asyncio.to_thread(frames.extract_last_frame, prev_path, frame_offset)
                 except Exception as e:
-                    print(f"  Shot {shot_id}: warning — frame extraction failed, falling back to T2V: {e}")
+                    print(f"  {tag}: warning — frame extraction failed, falling back to T2V: {e}")
                     shot_mode = "t2v"
             else:
-                print(f"  Shot {shot_id}: warning — previous shot not found, falling back to T2V")
+                print(f"  {tag}: warning — previous shot not found, falling back to T2V")
                 shot_mode = "t2v"
 
         is_continuation = (shot_mode == "i2v")
@@ -224,81 +362,353 @@ def process_story(
         else:
             prompt = prompt_builder.build_video_hero_prompt(channel_config, shot["description"])
 
-        print(f"  Shot {shot_id}: generating ({shot_mode.upper()}{'+ref' if shot_mode == 't2v' and char_refs else ''})...")
-
-        success = False
-        for attempt in range(1, MAX_RETRIES + 1):
+        key = content_cache.content_key(
+            tier.model, prompt, refs=ref_bytes, start_frame=start_frame, duration=shot_duration,
+            aspect_ratio=aspect_ratio, resolution=tier.resolution, mode=shot_mode,
+        )
+        if out_path.exists():
+            if content_cache.is_current(out_path, key):
+                print(f"  {tag}: already exists, skipping")
+                return True
+            print(f"  {tag}: inputs changed since it was generated, regenerating")
+            out_path.unlink()
+        if use_cache and content_cache.fetch(key, out_path):
+            print(f"  {tag}: served from cache")
+            return True
+
+        job = None
+        if journal is not None:
+            job = ShotJob(journal, f"{video_id}/{story_name}", shot_id, key, tier.model)
+
+        retry = retry_policy.Retry(tier.model)
+        video_file = None  # kept across attempts so a failed download retries the same video
+        while True:
             try:
-                if shot_mode == "i2v":
-                    video_file = generate_shot_i2v(
-                        client, prompt, aspect_ratio, shot_duration,
+                if video_file is not None:
+                    print(f"  {tag}: retrying download...")
+                elif shot_mode == "i2v":
+                    print(f"  {tag}: generating (I2V)...")
+                    video_file = await generate_shot_i2v(
+                        client, poller, prompt, aspect_ratio, shot_duration,
                         channel=channel_config,
                         start_frame=start_frame,
+                        job=job,
+                        hedger=hedger,
+                        tier=tier,
                     )
                 else:
-                    video_file = generate_shot_t2v(
-                        client, prompt, aspect_ratio, shot_duration,
+                    print(f"  {tag}: generating (T2V{'+ref' if char_refs else ''})...")
+                    video_file = await generate_shot_t2v(
+                        client, poller, prompt, aspect_ratio, shot_duration,
                         char_refs=char_refs or None,
+                        job=job,
+                        hedger=hedger,
+                        tier=tier,
                     )
-                video_file.save(str(out_path))
-                size = out_path.stat().st_size
-                if size < MIN_VALID_BYTES:
+                digest = await downloader.download_video(video_file, out_path, client.api_key_for(video_file))
+                try:
+                    mp4.validate_clip(out_path, shot_duration, aspect_ratio, tier.resolution)
+                except mp4.MP4Error as e:
+                    # The clip itself is bad: only a new generation can fix that
                     out_path.unlink()
-                    raise ValueError(f"Output too small ({size} bytes) — likely a failed generation")
-                print(f"  Shot {shot_id}: saved ({size / 1024 / 1024:.1f} MB)")
-                success = True
-                break
+                    video_file = None
+                    if job is not None:
+                        job.finished("failed", str(e))
+                    raise
+                size = out_path.stat().st_size
+                content_cache.store(key, out_path, digest)
+                print(f"  {tag}: saved ({size / 1024 / 1024:.1f} MB)")
+                if job is not None:
+                    job.finished("saved")
+                if modes.get(shot_id + 1) == "i2v":
+                    # Extract the next shot's start frame while the clip is still in the page cache
+                    try:
+                        await asyncio.to_thread(frames.extract_last_frame, out_path, frame_offset)
+                    except Exception as e:
+                        print(f"  {tag}: warning — could not pre-extract last frame: {e}")
+                return True
             except Exception as e:
+                # _run_operation has already marked a failed generation in the journal; a failed
+                # download leaves the operation "done", so an interrupted run can still re-attach
                 error_msg = str(e)
-                if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                    wait = RETRY_BACKOFF_SECONDS * attempt
-                    print(f"  Shot {shot_id}: rate limited, retrying in {wait}s (attempt {attempt}/{MAX_RETRIES})")
-                    time.sleep(wait)
+                wait = retry.next_delay(e)
+                if wait is None:
+                    break
+                if retry.last_class == retry_policy.QUOTA:
+                    print(f"  {tag}: rate limited, backing off {wait:.0f}s (attempt {retry.attempts})")
+                    client.penalize(tier.model, wait, e)
                 else:
-                    print(f"  Shot {shot_id}: error — {error_msg}")
-                    if attempt < MAX_RETRIES:
-                        time.sleep(RETRY_BACKOFF_SECONDS)
+                    print(f"  {tag}: {retry.last_class} error — {error_msg}; retrying in {wait:.0f}s")
+                    await asyncio.sleep(wait)
+
+        print(f"  {tag}: FAILED ({retry.last_class}) after {retry.attempts} attempt(s) — {error_msg}")
+        failures[shot_id] = f"{retry.last_class}: {error_msg}"
+        return False
+
+    failures: dict[int, str] = {}
+    outcome = await shot_scheduler.run_chains(chains, run_shot, concurrency, semaphore, keep_going)
+    for shot_id in outcome.blocked:
+        print(f"  {label}Shot {shot_id}: blocked — depends on a failed shot")
+    return StoryResult(
+        path,
+        {shot_id: failures.get(shot_id, "") for shot_id in outcome.failed},
+        outcome.blocked,
+        outcome.skipped,
+    )
+
 
-        if not success:
-            print(f"  Shot {shot_id}: FAILED after {MAX_RETRIES} attempts — quitting. Resume with --start_shot {shot_id}")
-            sys.exit(1)
+def load_story_settings(
+    story_path: str | Path,
+    channel: str | None = None,
+    shot_duration: int | None = None,
+    aspect_ratio: str | None = None,
+) -> tuple[dict, int, str]:
+    """Resolve (channel_config, shot_duration, aspect_ratio) from a story's metadata and CLI overrides."""
+    with open(story_path) as f:
+        metadata = (yaml.safe_load(f) or {}).get("metadata", {})
+    channel_name = channel or metadata.get("channel", "pup-pop-pup")
+    channel_config = prompt_builder.load_channel_config(channel_name)
+    return (
+        channel_config,
+        shot_duration or metadata.get("shot_duration", 8),
+        aspect_ratio or metadata.get("aspect_ratio", "16:9"),
+    )
 
-        if shot["id"] != shots[-1]["id"]:
-            time.sleep(DELAY_BETWEEN_SHOTS_SECONDS)
+
+def find_stories(target: str | Path) -> list[Path]:
+    """A story YAML path as-is, or every story*.yaml in a stories/{video_id}/ directory in order."""
+    target = Path(target)
+    if not target.is_dir():
+        return [target]
+    stories = [p for p in target.glob("story*.yaml") if p.stem[5:].isdigit()]
+    return sorted(stories, key=lambda p: int(p.stem[5:]))
+
+
+def write_report(
+    results: list[StoryResult], path: Path | None = None, extra_args: list[str] = (), expired: list[dict] = (),
+) -> Path:
+    """Write a JSON report of every story's failed and blocked shots. Returns its path.
+
+    `expired` lists the operations abandoned for missing their deadline or
+    stalling (see `OperationPoller.expired`), whether or not a resubmission
+    later succeeded.
+    """
+    if path is None:
+        path = REPORT_DIR / f"run-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    report = {
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "complete": not any(r.incomplete for r in results),
+        "stories": [
+            {
+                "story": str(r.story_path),
+                "failed": [{"shot": shot_id, "error": error} for shot_id, error in sorted(r.failed.items())],
+                "blocked": r.blocked,
+                "skipped": r.skipped,
+                "regenerate": r.regenerate_command(extra_args),
+            }
+            for r in results
+        ],
+        "expired_operations": list(expired),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+    return path
+
+
+def _finish(
+    results: list[StoryResult], report_path: Path | None, extra_args: list[str], expired: list[dict] = (),
+) -> None:
+    """Print what didn't get generated, write the run report, and exit non-zero if anything is missing."""
+    incomplete = [r for r in results if r.incomplete]
+    for r in incomplete:
+        parts = []
+        if r.failed:
+            parts.append(f"failed {', '.join(map(str, r.failed))}")
+        if r.blocked:
+            parts.append(f"blocked {', '.join(map(str, r.blocked))}")
+        if r.skipped:
+            parts.append(f"not attempted {', '.join(map(str, r.skipped))}")
+        print(f"  {r.story_path}: shot(s) {'; '.join(parts)}")
+        print(f"    Regenerate with: {r.regenerate_command(extra_args)}")
+
+    if expired:
+        print(f"  {len(expired)} operation(s) abandoned as overdue or stuck and resubmitted")
+    report = write_report(results, report_path, extra_args, expired)
+    print(f"Report: {report}")
+    if incomplete:
+        if len(results) > 1:
+            print(f"{len(incomplete)} of {len(results)} stories did not finish.")
+        sys.exit(1)
 
     print("Done.")
 
 
+def process_story(
+    story_path: str,
+    channel_config: dict,
+    shot_duration: int,
+    aspect_ratio: str,
+    start_shot: int = 1,
+    end_shot: int | None = None,
+    concurrency: int = shot_scheduler.MAX_CONCURRENT_SHOTS,
+    use_cache: bool = True,
+    shot_ids: set[int] | None = None,
+    keep_going: bool = False,
+    report_path: Path | None = None,
+    extra_args: list[str] = (),
+    hedge_percentile: float | None = None,
+    hedge_budget: int = hedging.DEFAULT_HEDGE_BUDGET,
+    tier: Tier = FINAL,
+    promote: bool = False,
+) -> None:
+    client = clients.make_pool()
+    latency = latency_model.LatencyModel()
+    poller = OperationPoller(latency=latency)
+    hedger = hedging.Hedger(latency, hedge_percentile, hedge_budget) if hedge_percentile else None
+    result = asyncio.run(generate_story(
+        story_path, channel_config, shot_duration, aspect_ratio,
+        client, poller, start_shot, end_shot, concurrency, JobJournal(), use_cache,
+        shot_ids=shot_ids, keep_going=keep_going, hedger=hedger, tier=tier, promote=promote,
+    ))
+    if hedger is not None and hedger.used:
+        print(f"  Hedged {hedger.used} operation(s); {hedger.won} duplicate(s) finished first")
+    if len(client.members) > 1:
+        print(f"  Credentials — {client.summary()}")
+    if result.failed and not keep_going:
+        print(f"  Shot(s) {', '.join(map(str, result.failed))} failed — quitting.")
+    _finish([result], report_path, extra_args, poller.expired)
+
+
+def process_batch(
+    stories: list[tuple[Path, dict, int, str]],
+    concurrency: int = shot_scheduler.MAX_CONCURRENT_SHOTS,
+    use_cache: bool = True,
+    keep_going: bool = False,
+    report_path: Path | None = None,
+    extra_args: list[str] = (),
+    hedge_percentile: float | None = None,
+    hedge_budget: int = hedging.DEFAULT_HEDGE_BUDGET,
+    tier: Tier = FINAL,
+    promote: bool = False,
+) -> None:
+    """Generate several stories in one process under one concurrency cap.
+
+    `stories` holds (story_path, channel_config, shot_duration, aspect_ratio)
+    tuples. Every story shares one client, poller and journal, and at most
+    `concurrency` scene chains are in flight across all of them; the rate
+    limiter already paces every request against the same per-model budget.
+    A failing story stops only its own chains.
+    """
+    async def run() -> list[StoryResult]:
+        journal = JobJournal()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        return await asyncio.gather(*(
+            generate_story(
+                path, channel_config, shot_duration, aspect_ratio, client, poller,
+                journal=journal, use_cache=use_cache, semaphore=semaphore,
+                label=f"[{path.parent.name}/{path.stem}] ", keep_going=keep_going, hedger=hedger,
+                tier=tier, promote=promote,
+            )
+            for path, channel_config, shot_duration, aspect_ratio in stories
+        ))
+
+    latency = latency_model.LatencyModel()
+    poller = OperationPoller(latency=latency)
+    hedger = hedging.Hedger(latency, hedge_percentile, hedge_budget) if hedge_percentile else None
+
+    client = clients.make_pool()
+    print(f"Batch: {len(stories)} stories, up to {concurrency} scene chains in flight")
+    results = asyncio.run(run())
+    if hedger is not None and hedger.used:
+        print(f"  Hedged {hedger.used} operation(s); {hedger.won} duplicate(s) finished first")
+    if len(client.members) > 1:
+        print(f"  Credentials — {client.summary()}")
+    _finish(results, report_path, extra_args, poller.expired)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Generate video clips with frame-based continuity between shots.")
     parser.add_argument("--channel", default=None, help="Override channel configuration.")
-    parser.add_argument("--story", required=True, help="Path to the story YAML file.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--story", help="Path to a story YAML file, or a stories/{video_id}/ directory to batch.")
+    target.add_argument("--video_id", nargs="+", help="Batch every story of one or more video_ids.")
     parser.add_argument("--shot_duration", default=None, type=int, choices=[4, 6, 8], help="Override duration per shot in seconds.")
     parser.add_argument("--aspect_ratio", default=None, help="Override aspect ratio (e.g., 16:9).")
     parser.add_argument("--start_shot", default=1, type=int, help="Shot ID to start from (default: 1).")
     parser.add_argument("--end_shot", default=None, type=int, help="Shot ID to stop at, inclusive (default: last shot).")
+    parser.add_argument("--shots", default=None,
+                        help="Comma-separated shot IDs to generate (e.g. from a run report), instead of a range.")
+    parser.add_argument("--concurrency", default=shot_scheduler.MAX_CONCURRENT_SHOTS, type=int,
+                        help=f"Maximum scene chains generating at once (default: {shot_scheduler.MAX_CONCURRENT_SHOTS}).")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Always generate fresh clips instead of reusing identical cached requests.")
+    parser.add_argument("--keep_going", action="store_true",
+                        help="On a failed shot, block only the I2V shots that continue from it and carry on with the rest.")
+    parser.add_argument("--hedge_percentile", default=None, type=float,
+                        help="Submit a duplicate request when an operation runs past this percentile of its "
+                             "historical latency (e.g. 95). Off by default.")
+    parser.add_argument("--hedge_budget", default=hedging.DEFAULT_HEDGE_BUDGET, type=int,
+                        help=f"Maximum duplicate generations per run when hedging (default: {hedging.DEFAULT_HEDGE_BUDGET}).")
+    parser.add_argument("--report", default=None, type=Path,
+                        help=f"Where to write the JSON run report (default: {REPORT_DIR}/run-<time>.json).")
+    quality = parser.add_mutually_exclusive_group()
+    quality.add_argument("--draft", action="store_true",
+                         help=f"Generate a {DRAFT_RESOLUTION} review draft into output/{{video_id}}/draft_clips/.")
+    quality.add_argument("--promote", action="store_true",
+                         help="Regenerate drafted shots at full resolution (only --shots, if given).")
     args = parser.parse_args()
 
-    if not Path(args.story).exists():
-        print(f"Error: story file not found: {args.story}", file=sys.stderr)
+    shot_ids = None
+    if args.shots:
+        try:
+            shot_ids = {int(x) for x in args.shots.split(",") if x.strip()}
+        except ValueError:
+            parser.error("--shots must be a comma-separated list of shot IDs")
+
+    # Settings a regenerate command has to repeat
+    extra_args = []
+    for flag in ("channel", "shot_duration", "aspect_ratio"):
+        if getattr(args, flag) is not None:
+            extra_args += [f"--{flag}", str(getattr(args, flag))]
+    if args.no_cache:
+        extra_args.append("--no_cache")
+    if args.hedge_percentile:
+        extra_args += ["--hedge_percentile", f"{args.hedge_percentile:g}", "--hedge_budget", str(args.hedge_budget)]
+    if args.draft or args.promote:
+        extra_args.append("--draft" if args.draft else "--promote")
+    tier = DRAFT if args.draft else FINAL
+
+    if args.video_id:
+        story_paths = [p for video_id in args.video_id for p in find_stories(Path("stories") / video_id)]
+    else:
+        story_paths = find_stories(args.story)
+
+    missing = [p for p in story_paths if not p.exists()]
+    if not story_paths or missing:
+        print(f"Error: story file not found: {missing[0] if missing else args.story or args.video_id}", file=sys.stderr)
         sys.exit(1)
 
-    with open(args.story) as f:
-        story_data = yaml.safe_load(f)
-
-    metadata = story_data.get("metadata", {})
-    channel_name = args.channel or metadata.get("channel", "pup-pop-pup")
-    shot_duration = args.shot_duration or metadata.get("shot_duration", 8)
-    aspect_ratio = args.aspect_ratio or metadata.get("aspect_ratio", "16:9")
-
     try:
-        channel_config = prompt_builder.load_channel_config(channel_name)
+        stories = [
+            (path, *load_story_settings(path, args.channel, args.shot_duration, args.aspect_ratio))
+            for path in story_paths
+        ]
     except FileNotFoundError as e:
         print(e, file=sys.stderr)
         sys.exit(1)
 
-    process_story(args.story, channel_config, shot_duration, aspect_ratio, args.start_shot, args.end_shot)
+    if len(stories) == 1:
+        path, channel_config, shot_duration, aspect_ratio = stories[0]
+        process_story(path, channel_config, shot_duration, aspect_ratio, args.start_shot, args.end_shot,
+                      args.concurrency, not args.no_cache, shot_ids, args.keep_going, args.report, extra_args,
+                      args.hedge_percentile, args.hedge_budget, tier, args.promote)
+        return
+
+    if args.start_shot != 1 or args.end_shot is not None or shot_ids is not None:
+        parser.error("--start_shot/--end_shot/--shots apply to a single story")
+    process_batch(stories, args.concurrency, not args.no_cache, args.keep_going, args.report, extra_args,
+                  args.hedge_percentile, args.hedge_budget, tier, args.promote)
 
 
 if __name__ == "__main__":